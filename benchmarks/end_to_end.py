@@ -0,0 +1,153 @@
+"""
+End-to-end benchmark
+====================
+Runs every phase of Rom Detective against synthetic libraries (see benchmarks/generate_library.py)
+
+    python benchmarks/end_to_end.py [--sizes 1000 10000 100000] [--output results.json] [--compare old.json]
+
+Phases, per library size:
+    index: index_all (no index cache)
+    index_parallel: index_all(parallel=True)
+    index_cache_cold: index_all with an empty index cache
+    index_cache_warm: index_all with a filled index cache
+    update_stats: update_stats of every folder
+    dry_run: create_shortcuts (dry run, no files written)
+    create_shortcuts: create_shortcuts into an empty target folder
+    sync_shortcuts: sync_shortcuts on the unchanged library (nothing to write)
+
+Every phase reports its wall time, items/sec and peak memory (tracemalloc, python allocations only).
+Tracing memory slows Python down, use --no-memory for undisturbed timings.
+Results are saved as JSON (default: benchmarks/results/<timestamp>.json)
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+from generate_library import generate_library
+
+sys.path.insert(0, str(Path(os.path.abspath(__file__)).parents[1] / 'src'))
+
+from rom_detective.const import PLATFORMS  # noqa: E402
+from rom_detective.logger import Logger  # noqa: E402
+from rom_detective.rom_detective import RomDetective  # noqa: E402
+from rom_detective.shortcuts import create_shortcuts, sync_shortcuts  # noqa: E402
+
+RESULTS_FOLDER = Path(os.path.abspath(__file__)).parent / 'results'
+
+
+def measure(task, items: int, memory: bool = True) -> dict:
+    """Runs task() once, returns its wall time, items/sec and peak memory (no items/sec if it raised)"""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        error = None
+        try:
+            task()
+        except (OSError, RuntimeError) as e:  # e.g. missing privileges to create symlinks
+            error = str(e)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if memory else None
+    if memory:
+        tracemalloc.stop()
+    return {'seconds': round(seconds, 4),
+            'items': items,
+            'items_per_second': round(items / seconds, 1) if seconds and error is None else None,
+            'peak_memory': peak,
+            'error': error}
+
+
+def run_size(size: int, memory: bool = True) -> dict[str, dict]:
+    """Generates a library of <size> items and benchmarks every phase against it"""
+    with tempfile.TemporaryDirectory() as root:
+        folders = generate_library(root, size)
+        files = sum(len(names) for _, _, names in os.walk(root))
+
+        def detective() -> RomDetective:
+            rd = RomDetective()
+            for path, platform_id in folders.items():
+                if platform_id == 'win':
+                    rd.add_steam_folder(path)
+                else:
+                    rd.add_rom_folder(path, platform=PLATFORMS[platform_id])
+            return rd
+
+        rd = detective()
+        cached = detective()
+        cached.enable_index_cache(f'{root}\\index.db')
+        target = f'{root}\\target'
+        os.makedirs(target)
+        results = dict()
+
+        results['index'] = measure(rd.index_all, files, memory)
+        results['index_parallel'] = measure(lambda: rd.index_all(parallel=True), files, memory)
+        results['index_cache_cold'] = measure(cached.index_all, files, memory)
+        results['index_cache_warm'] = measure(cached.index_all, files, memory)
+        cached.index_cache.close()
+
+        games = len(rd.games)
+        results['update_stats'] = measure(rd.update_stats, games, memory)
+        results['dry_run'] = measure(lambda: create_shortcuts(rd.games, target_folder=target, dry_run=True),
+                                     games, memory)
+
+        created = list()
+        results['create_shortcuts'] = measure(lambda: created.extend(create_shortcuts(rd.games, target_folder=target)),
+                                              games, memory)
+        logger = Logger()
+        [logger.add(entry) for entry in created]
+        logger.write(root)
+        logger.reset()
+        previous = logger.load(root)
+        results['sync_shortcuts'] = measure(lambda: sync_shortcuts(rd.games, previous, target_folder=target),
+                                            games, memory)
+        return results
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Prints the wall time of every phase relative to a previous run"""
+    for size, phases in results['sizes'].items():
+        for phase, result in phases.items():
+            old = baseline.get('sizes', {}).get(size, {}).get(phase)
+            if old and old['seconds'] and result['seconds']:
+                print(f'{size:>8} {phase:<18} {result["seconds"] / old["seconds"]:6.2f}x '
+                      f'({old["seconds"]:.3f}s -> {result["seconds"]:.3f}s)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--no-memory', action='store_true', help='do not trace peak memory')
+    parser.add_argument('--output', help='JSON file to save the results to')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    args = parser.parse_args()
+
+    results = {'timestamp': datetime.now().isoformat(timespec='seconds'),
+               'python': sys.version.split()[0],
+               'platform': platform.platform(),
+               'sizes': dict()}
+    for size in args.sizes:
+        results['sizes'][str(size)] = run_size(size, memory=not args.no_memory)
+        for phase, result in results['sizes'][str(size)].items():
+            peak = f'{result["peak_memory"] / 2 ** 20:8.1f} MiB' if result['peak_memory'] is not None else ''
+            print(f'{size:>8} {phase:<18} {result["seconds"]:8.3f}s {result["items_per_second"] or 0:12.0f}/s {peak}'
+                  + (f' ({result["error"]})' if result['error'] else ''))
+
+    output = Path(args.output) if args.output else RESULTS_FOLDER / f'{datetime.now():%Y%m%d-%H%M%S}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding='utf-8')
+    print(f'Saved results to {output}')
+
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text(encoding='utf-8')))
+
+
+if __name__ == '__main__':
+    main()
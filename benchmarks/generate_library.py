@@ -0,0 +1,121 @@
+"""
+Synthetic library generator
+===========================
+Builds a fake ROM/game library of a given size, for benchmarks (see benchmarks/end_to_end.py)
+
+    python benchmarks/generate_library.py <destination> [--size 10000]
+
+Layout (empty files except meta.xml and Steam files, <size> items in total, split by SHAPE):
+    roms\\<platform>\\Game 000001 (USA).<ext>: flat cartridge folders (n64, snes, gba, switch)
+    roms\\playstation 3\\<id>\\PS3_GAME\\USRDIR\\EBOOT.BIN: PS3 games (bundled gameslist ids), every 4th nested
+    roms\\wiiu\\Game 000001\\code\\game.rpx (+ meta\\meta.xml): Wii U titles, every 4th title with an update and a dlc
+    steam\\steamapps\\libraryfolders.vdf (+ appmanifest_<id>.acf): a Steam library
+    config.cfg: a config for every generated folder (python -m rom_detective --config <destination>\\config.cfg)
+"""
+import argparse
+import os
+from pathlib import Path
+
+import vdf
+
+# Share of the items per shape
+SHAPE = {'cartridge': 0.7, 'ps3': 0.1, 'wiiu': 0.1, 'steam': 0.1}
+CARTRIDGES = {'n64': 'z64', 'snes': 'smc', 'gba': 'gba', 'switch': 'nsp'}
+GAMESLIST_PS3 = Path(os.path.abspath(__file__)).parents[1] / 'src' / 'data' / 'gameslist_ps3.txt'
+
+
+META_XML = ('<?xml version="1.0" encoding="utf-8"?>\n<menu type="complex" access="777">\n'
+            '    <longname_en type="string" length="512">{title}</longname_en>\n</menu>\n')
+
+
+def _touch(path: str, content: str = '') -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+def _cartridges(root: str, amount: int) -> dict[str, str]:
+    folders = {platform: f'{root}\\roms\\{platform}' for platform in CARTRIDGES}
+    for i in range(amount):
+        platform = list(CARTRIDGES)[i % len(CARTRIDGES)]
+        _touch(f'{folders[platform]}\\Game {i:06d} (USA).{CARTRIDGES[platform]}')
+    return {folder: platform for platform, folder in folders.items()}
+
+
+def _ps3_ids() -> list[str]:
+    """The ids (BLUS00001) of the bundled gameslist, so the generated games get indexed rather than blacklisted"""
+    with open(GAMESLIST_PS3, 'r', encoding='utf-8') as file:
+        return [g_id for g_id, _, _ in (line.partition('=') for line in file)
+                if len(g_id) == 9 and g_id[:4].isalpha() and g_id[4:].isdigit()]
+
+
+def _ps3(root: str, amount: int) -> dict[str, str]:
+    folder = f'{root}\\roms\\playstation 3'
+    ids = _ps3_ids()
+    for i in range(amount):
+        # Once every id is used, the ids are reused inside the (unique) series folders
+        g_id = ids[i % len(ids)]
+        nested = i % 4 == 0 or i >= len(ids)
+        game = f'{folder}\\Series {i // 4:05d}\\{g_id}' if nested else f'{folder}\\{g_id}'
+        _touch(f'{game}\\PS3_GAME\\USRDIR\\EBOOT.BIN')
+    return {folder: 'ps3'}
+
+
+def _wiiu(root: str, amount: int) -> dict[str, str]:
+    folder = f'{root}\\roms\\wiiu'
+    for i in range(amount):
+        for title in [f'{folder}\\Game {i:06d}'] + ([f'{folder}\\Game {i:06d}\\update',
+                                                    f'{folder}\\Game {i:06d}\\dlc'] if i % 4 == 0 else []):
+            _touch(f'{title}\\code\\game.rpx')
+            _touch(f'{title}\\meta\\meta.xml', META_XML.format(title=f'Wii U Game {i:06d}'))
+    return {folder: 'wiiu'}
+
+
+def _steam(root: str, amount: int) -> dict[str, str]:
+    folder = f'{root}\\steam'
+    os.makedirs(f'{folder}\\steamapps', exist_ok=True)
+    apps = {str(100000 + i): '0' for i in range(amount)}
+    for g_id in apps:
+        # Written by hand, as Steam separates keys and values with tabs
+        with open(f'{folder}\\steamapps\\appmanifest_{g_id}.acf', 'w', encoding='utf-8') as file:
+            file.write(f'"AppState"\n{{\n\t"appid"\t\t"{g_id}"\n\t"name"\t\t"Steam Game {g_id}"\n}}\n')
+    with open(f'{folder}\\steamapps\\libraryfolders.vdf', 'w', encoding='utf-8') as file:
+        vdf.dump({'libraryfolders': {'0': {'path': folder, 'apps': apps}}}, file, pretty=True)
+    return {folder: 'win'}
+
+
+def generate_library(root: str, size: int, shape: dict[str, float] = None) -> dict[str, str]:
+    """
+    Generates a library of <size> items in root, returns the generated folders ({path: platform id})
+    A config.cfg for the generated folders is written to root
+    """
+    shape = shape or SHAPE
+    amounts = {name: int(size * share) for name, share in shape.items()}
+    amounts['cartridge'] = amounts.get('cartridge', 0) + size - sum(amounts.values())
+
+    folders = dict()
+    for name, generate in [('cartridge', _cartridges), ('ps3', _ps3), ('wiiu', _wiiu)]:
+        if amounts.get(name):
+            folders.update(generate(root, amounts[name]))
+    steam = _steam(root, amounts['steam']) if amounts.get('steam') else dict()
+
+    with open(f'{root}\\config.cfg', 'w', encoding='utf-8') as file:
+        file.write(f'TARGET_FOLDER=={root}\\target\n')
+        file.write(''.join(f'default:::{platform}:::{path}\n' for path, platform in folders.items()))
+        file.write(''.join(f'steam:::{platform}:::{path}\n' for path, platform in steam.items()))
+    return {**folders, **steam}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('destination')
+    parser.add_argument('--size', type=int, default=10000)
+    args = parser.parse_args()
+
+    os.makedirs(args.destination, exist_ok=True)
+    folders = generate_library(os.path.abspath(args.destination), args.size)
+    print(f'Generated {args.size} items over {len(folders)} folders in {args.destination}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Import-time benchmark
+=====================
+Measures the cold start of rom_detective in fresh interpreters
+
+    python benchmarks/import_time.py [--runs 10]
+
+Reports the median wall time of:
+    import: importing the core package (rom_detective.rom_detective)
+    platforms: import + first access of PLATFORMS
+    databases: import + first lookup in the PS3 database
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_FOLDER = Path(os.path.abspath(__file__)).parents[1] / 'src'
+
+SCENARIOS = {
+    'import': 'import rom_detective.rom_detective',
+    'platforms': 'import rom_detective.rom_detective\n'
+                 'from rom_detective.const import PLATFORMS\n'
+                 'PLATFORMS["n64"]',
+    'databases': 'import rom_detective.rom_detective\n'
+                 'from rom_detective.const import DATABASES\n'
+                 '"exampleid" in DATABASES.gameslist_ps3',
+}
+
+
+def measure(code: str, runs: int) -> float:
+    """Returns the median wall time (ms) of running code in a fresh interpreter"""
+    env = dict(os.environ, PYTHONPATH=str(SRC_FOLDER))
+    timings = list()
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], env=env, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    baseline = measure('pass', args.runs)
+    print(f'{"interpreter":<12}{baseline:8.1f} ms')
+    for name, code in SCENARIOS.items():
+        timing = measure(code, args.runs)
+        print(f'{name:<12}{timing:8.1f} ms (+{timing - baseline:.1f} ms)')
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,7 @@ a = Analysis(
                    'pathlib.Path',
                    'xml.dom.minidom',
                    'dataclasses',
+                   'sqlite3',
 	],
     hookspath=[],
     hooksconfig={},
@@ -1,4 +1,8 @@
 import sys
+import threading
+from collections import Counter
+from functools import partial
+from typing import Callable
 
 from PyQt6.QtWidgets import *
 from PyQt6.QtGui import *
@@ -7,19 +11,151 @@ from qt_material import apply_stylesheet
 
 from rom_detective import initialize_folder, DEFAULT_TARGET_FOLDER, ROOT_FOLDER, MEI_FOLDER
 from rom_detective.const import PLATFORMS
+from rom_detective.jobs import Job, Progress, index_job, shortcuts_job
 from rom_detective.platforms import PlatformFlag
-from rom_detective.rom_detective import RomDetective
+from rom_detective.query import game_statuses
+from rom_detective.rom_detective import RomDetective, RDFlag
 
-# TODO: compare logs to current run in order to update shortcuts, delete missing, etc.
 # TODO: Pretty things up
 # TODO: Write new tests
 
 
+CONSOLE_SCROLLBACK = 5000  # Lines kept in the console
+CONSOLE_INTERVAL = 100  # Milliseconds between console updates
+CONSOLE_COLORS = {'warning': '#ff00ff', 'error': '#ff00ff', 'info': '#0099ff', 'blacklist': '#0099ff'}
+
+
+def _console_level(line: str) -> str:
+    """Returns the level of a console line (its prefix: warning, error, info, blacklist), None if it has none"""
+    prefix = line[:9].lower()
+    return next((level for level in CONSOLE_COLORS if prefix.startswith(level)), None)
+
+
 class EmittingStream(QObject):
+    """
+    Buffers everything written to it (from any thread),
+    emitting the complete lines in one batch every <interval> milliseconds
+    """
     text = pyqtSignal(str)
 
+    def __init__(self, interval: int = CONSOLE_INTERVAL, **kwargs):
+        super().__init__(**kwargs)
+        self._buffer = list()
+        self._lock = threading.Lock()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._emit_lines)
+        self._timer.start(interval)
+
     def write(self, text: object):
-        self.text.emit(str(text))
+        with self._lock:
+            self._buffer.append(str(text))
+
+    def _emit_lines(self, partial_line: bool = False):
+        """Emits the buffered lines, an unfinished last line is kept back unless partial_line"""
+        with self._lock:
+            text = ''.join(self._buffer)
+            end = len(text) if partial_line else text.rfind('\n') + 1
+            self._buffer = [text[end:]] if text[end:] else list()
+        if text[:end]:
+            self.text.emit(text[:end])
+
+    def flush(self):
+        self._emit_lines(partial_line=True)
+
+
+class JobSignals(QObject):
+    """Forwards the callbacks of a Job (called from its worker thread) to the GUI thread"""
+    progress = pyqtSignal(object)
+    done = pyqtSignal(object)
+    error = pyqtSignal(object)
+
+
+class GameListModel(QAbstractTableModel):
+    """
+    Table of games (platform, title, source, status), the view only requests the rows it shows
+
+    Sorting and filtering reorder a list of row numbers, the games themselves are never copied
+    """
+    COLUMNS = ['Platform', 'Title', 'Source', 'Status']
+    COLORS = [QColor('#ff0e0e'), QColor('#fff'), QColor('#7e7eff'), None]
+    STATUS_COLORS = {RDFlag.WHITELISTED: QColor('#0099ff'), RDFlag.BLACKLISTED: QColor('#ff00ff')}
+
+    def __init__(self):
+        super().__init__()
+        self.games = list()
+        self.rows = list()
+        self._keys = dict()  # {column: [sort key per game]}, built on the first sort
+        self._search = None  # [text to filter per game], built on the first filter
+        self._filter = ''
+        self._sort = None
+
+    @staticmethod
+    def _value(game, column: int) -> str:
+        if column == 0:
+            return game.platform.id
+        if column == 1:
+            return game.title
+        if column == 2:
+            return game.source
+        return game_statuses(game)[0]
+
+    def set_games(self, games: list[any]):
+        self.beginResetModel()
+        self.games = games
+        self._keys, self._search = dict(), None
+        self._apply()
+        self.endResetModel()
+
+    def set_filter(self, text: str):
+        self.beginResetModel()
+        self._filter = text.casefold()
+        self._apply()
+        self.endResetModel()
+
+    def _apply(self):
+        """Rebuilds the visible rows from the filter and sort order"""
+        if not self._filter:
+            self.rows = list(range(len(self.games)))
+        else:
+            if self._search is None:
+                self._search = ['\t'.join(self._value(game, column) for column in range(len(self.COLUMNS))).casefold()
+                                for game in self.games]
+            self.rows = [row for row, text in enumerate(self._search) if self._filter in text]
+        if self._sort:
+            column, order = self._sort
+            if column not in self._keys:
+                self._keys[column] = [self._value(game, column).casefold() for game in self.games]
+            keys = self._keys[column]
+            self.rows.sort(key=keys.__getitem__, reverse=order == Qt.SortOrder.DescendingOrder)
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self._sort = (column, order)
+        self._apply()
+        self.layoutChanged.emit()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        game = self.games[self.rows[index.row()]]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return self._value(game, index.column())
+        if role == Qt.ItemDataRole.ForegroundRole:
+            if index.column() == 3:
+                return self.STATUS_COLORS.get(game_statuses(game)[0])
+            return self.COLORS[index.column()]
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
 
 
 def _create_button(text: str, method: object) -> QPushButton:
@@ -88,10 +224,40 @@ class MainWindow(QMainWindow):
         l.addWidget(remove_steam_folder, 1, 6)
         l.addWidget(list_games, 1, 7)
 
-        # Center console
+        # Center console & game list
         self.console = _create_terminal(hide=False)
         self.console.setMinimumWidth(600)
-        l.addWidget(self.console, 2, 1, 5, 6)
+        self.console.document().setMaximumBlockCount(CONSOLE_SCROLLBACK)
+        self.console_counts = Counter()
+        self.console_levels = QLabel()
+        self.statusBar().addPermanentWidget(self.console_levels)
+
+        self.game_list = GameListModel()
+        self.game_filter = QLineEdit()
+        self.game_filter.setPlaceholderText('Filter (platform, title, source or status)')
+        self.game_filter.textChanged.connect(self.filter_game_list)
+        self.game_table = QTableView()
+        self.game_table.setModel(self.game_list)
+        self.game_table.setSortingEnabled(True)
+        self.game_table.sortByColumn(1, Qt.SortOrder.AscendingOrder)
+        self.game_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.game_table.setWordWrap(False)
+        self.game_table.verticalHeader().hide()
+        self.game_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.game_table.horizontalHeader().setStretchLastSection(True)
+        [self.game_table.setColumnWidth(column, width) for column, width in enumerate([80, 250, 250])]
+
+        games_tab = QWidget()
+        games_layout = QVBoxLayout()
+        games_layout.setContentsMargins(0, 0, 0, 0)
+        games_layout.addWidget(self.game_filter)
+        games_layout.addWidget(self.game_table)
+        games_tab.setLayout(games_layout)
+
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.console, 'Console')
+        self.tabs.addTab(games_tab, 'Games')
+        l.addWidget(self.tabs, 2, 1, 5, 6)
 
         # Stats
         self.stats = QLabel('Stats:\n'
@@ -138,6 +304,8 @@ class MainWindow(QMainWindow):
         self.show()
 
         self.rd = RomDetective
+        self.job = None
+        self.job_signals = None
         self.rd_init()
 
     def open_dev_url(self):
@@ -147,35 +315,74 @@ class MainWindow(QMainWindow):
     def selected_path(self):
         return ''.join(self.selector_path.currentText().split(' [')[:-1])
 
-    def print_game_list(self, games: list[any], blacklist: bool = False):
-        if not games and not blacklist:
-            print('Info: No games.')
-            return
-        if not games and blacklist:
-            print('Info: Nothing blacklisted')
+    def show_game_list(self, games: list[any], description: str):
+        """Shows the games in the Games tab (see GameListModel)"""
+        self.game_list.set_games(games)
+        self.tabs.setTabText(1, f'Games ({self.game_list.rowCount()}/{len(games)})')
+        self.tabs.setCurrentIndex(1)
+        print(f'Info: Listing {description} ({len(games)})')
+
+    def filter_game_list(self, text: str):
+        self.game_list.set_filter(text)
+        self.tabs.setTabText(1, f'Games ({self.game_list.rowCount()}/{len(self.game_list.games)})')
+
+    @property
+    def busy(self) -> bool:
+        """True (with a warning) while a job is running"""
+        if self.job:
+            print('Warning: Busy, wait for the current task to finish')
+        return bool(self.job)
+
+    def run_job(self, create_job: Callable[..., Job], then: Callable = None) -> None:
+        """
+        Runs a job (see rom_detective.jobs) on the thread pool, keeping the window responsive
+        then() is called once the job is done
+        """
+        if self.busy:
             return
-        for game in games:
-            c_platform = QColor('#ff0e0e')
-            c_title = QColor('#fff')
-            c_brackets = QColor('#0099ff')
-            c_source = QColor('#7e7eff')
-            self.console.setTextColor(c_platform)
-            self.console.insertPlainText(f'[{game.platform.id}]')
-
-            self.console.setTextColor(c_title)
-            self.console.insertPlainText(f': {game.title}')
-
-            if blacklist:
-                self.console.setTextColor(c_brackets)
-                self.console.insertPlainText(f' ["')
-                self.console.setTextColor(c_source)
-                self.console.insertPlainText(f'{game.source}')
-                self.console.setTextColor(c_brackets)
-                self.console.insertPlainText(f'"]')
-
-            self.console.setTextColor(QColor('#fff'))
-            self.console.insertPlainText('\n')
-            self.console.ensureCursorVisible()
+        self.job_signals = JobSignals()
+        self.job_signals.progress.connect(self.show_progress)
+        self.job_signals.done.connect(lambda result: self.job_finished(then))
+        self.job_signals.error.connect(self.job_failed)
+        self.job = create_job(on_progress=self.job_signals.progress.emit,
+                              on_done=self.job_signals.done.emit,
+                              on_error=self.job_signals.error.emit)
+        QThreadPool.globalInstance().start(self.job.run)
+
+    def job_finished(self, then: Callable = None):
+        self.job = None
+        self.statusBar().clearMessage()
+        if then:
+            then()
+
+    def job_failed(self, error: Exception):
+        self.job = None
+        self.statusBar().clearMessage()
+        print(f'Warning: {error}')
+        self.update_stats()
+
+    def show_progress(self, progress: Progress):
+        """Shows the partial results of a running job"""
+        if progress.phase == 'index':
+            self.statusBar().showMessage(f'Indexed {progress.path} ({progress.done}/{progress.total})')
+            self.stats.setText(f'Stats:\n'
+                               f'{len(self.rd.platforms)} platforms\n'
+                               f'{progress.counts[RDFlag.BLACKLISTED]} blacklisted\n')
+            self.games_amount.setText(f'{progress.counts[RDFlag.INDEXED]}/{progress.counts["games"]} Games total')
+        else:
+            self.statusBar().showMessage(f'Shortcuts: {progress.done} done')
+
+    def update_stats(self):
+        self.stats.setText(f'Stats:\n'
+                           f'{len(self.rd.platforms)} platforms\n'
+                           f'{self.rd.count(RDFlag.BLACKLISTED)} blacklisted\n')
+        self.games_amount.setText(f'{self.rd.count(RDFlag.INDEXED)}/{len(self.rd.games)} Games total')
+
+    def closeEvent(self, event):
+        if self.job:
+            self.job.cancel()
+            QThreadPool.globalInstance().waitForDone()
+        super().closeEvent(event)
 
     def confirm_prompt(self, title, text):
         confirm = QMessageBox()
@@ -193,6 +400,8 @@ class MainWindow(QMainWindow):
                 self.rd.load_config()
             except Warning as e:
                 print(f'Warning: {e}')
+        self.rd.enable_index_cache()
+        self.rd.enable_history()
         if self.rd.platforms:
             print(f'Info: Loaded {len(self.rd.platforms)} platforms from config')
             self.update_paths()
@@ -202,108 +411,70 @@ class MainWindow(QMainWindow):
             self.target_folder.setText(self.rd.target_folder)
 
     def index_all(self):
-        if not self.rd.is_indexed:
-            self.rd.index_all()
-            print(f'Info: {len(self.rd.games)} games found over {len(self.rd.platforms)} platforms.')
+        # Changes to individual folders are re-indexed by Rom Detective itself
+        self.run_job(partial(index_job, self.rd, parallel=True), then=self.index_finished)
 
-            # TODO: Make property of Rom Detective
-            normal = [game for game in self.rd.games if not game.blacklisted or game.whitelisted]
-            blacklisted = [game for game in self.rd.games if game.blacklisted and not game.whitelisted]
-
-            self.stats.setText(f'Stats:\n'
-                               f'{len(self.rd.platforms)} platforms\n'
-                               f'{len(blacklisted)} blacklisted\n')
-            self.games_amount.setText(f'{len(normal)}/{len(self.rd.games)} Games total')
-            self.rd.save_config()
+    def index_finished(self):
+        print(f'Info: {len(self.rd.games)} games found over {len(self.rd.platforms)} platforms.')
+        self.update_stats()
+        self.rd.save_config()
 
     def list_all_blacklist(self):
-        games = [game for game in self.rd.games if game.blacklisted and not game.whitelisted]
-        print('Info: All blacklisted items')
-        self.print_game_list(games, blacklist=True)
-        print('Info: End all blacklisted items')
+        if self.busy:
+            return
+        games = self.rd.query(RDFlag.BLACKLISTED)
+        if not games:
+            print('Info: Nothing blacklisted')
+            return
+        self.show_game_list(games, 'all blacklisted items')
 
     def list_all_games(self):
+        if self.busy:
+            return
         if not self.rd.games:
             print(f'Warning: No games found')
             return
-        games = [game for game in self.rd.games if not game.blacklisted or game.whitelisted]
-        print(f'Info: Listing all games')
-        self.print_game_list(games)
-        print('Info: End of list')
-        self.list_all_blacklist()
+        self.show_game_list(self.rd.query(), 'all games')
 
     def list_selected_roms(self):
+        if self.busy:
+            return
         if self.selected_path not in self.rd.platforms.keys():
             print(f'Warning: Cannot display gamelist for selected path')
             return
-        games = [game for game in self.rd.games
-                 if (not game.blacklisted or game.whitelisted)
-                 and self.selected_path in game.source]
+        games = self.rd.query(path=self.selected_path)
         if not games:
             print(f'Warning: No games found from {self.selected_path}')
             return
-        print(f'Info: Listing ROMs in {self.selected_path} ({len(games)})')
-        self.print_game_list(games)
-        print('Info: End of list')
-        self._list_blacklist_selected_roms()
+        self.show_game_list(games, f'ROMs in {self.selected_path}')
 
     def list_steam_games(self):
+        if self.busy:
+            return
         if not self.rd.steam_folder:
             print(f'Warning: Steam folder not specified')
             return
-        games = [game for game in self.rd.games
-                 if (not game.blacklisted or game.whitelisted)
-                 and game.platform.flag == PlatformFlag.STEAM]
+        games = self.rd.query(path=self.rd.steam_folder)
         if not games:
             print('Warning: No games found from Steam')
             return
-        print(f'Info: Listing games in Steam ({len(games)})')
-        self.print_game_list(games)
-        print('Info: End of Steam gameslist')
-        self._list_blacklist_steam()
-
-    def _list_blacklist_selected_roms(self):
-        if self.selected_path not in self.rd.platforms.keys():
-            print(f'Warning: Cannot display blacklist for selected path')
-            return
-        games = [game for game in self.rd.games
-                 if game.blacklisted and not game.whitelisted
-                 and self.rd.platforms[self.selected_path] == game.platform]
-        if not games:
-            return
-        print(f'Blacklisted items in {self.selected_path} ({len(games)})')
-        self.print_game_list(games, blacklist=True)
-        print('End blacklist.')
-
-    def _list_blacklist_steam(self):
-        if not self.rd.steam_folder:
-            print(f'Warning: Cannot display blacklist for Steam')
-            return
-        games = [game
-                 for game in self.rd.games
-                 if game.blacklisted and not game.whitelisted
-                 and game.platform.flag == PlatformFlag.STEAM]
-        if not games:
-            return
-        print(f'Blacklisted items for Steam ({len(games)})')
-        self.print_game_list(games, blacklist=True)
-        print('End blacklist.')
+        self.show_game_list(games, 'games in Steam')
 
     def dry_run(self):
-        self.index_all()
         print('Info: Simulated output, logs are not actually written')
-        self.rd.create_shortcuts(dry_run=True)
+        self.run_job(partial(shortcuts_job, self.rd, dry_run=True, sync=True), then=self.index_finished)
 
     def create_shortcuts(self):
-        self.index_all()
-        self.rd.create_shortcuts(dry_run=False)
+        self.run_job(partial(shortcuts_job, self.rd, dry_run=False, sync=True), then=self.index_finished)
 
     def add_rom_folder(self):
         folder = QFileDialog.getExistingDirectory(self, 'Select ROMs or platform folder').replace('/', '\\')
-        if folder:
-            self.rd.add_rom_folder(folder)
-            self.update_paths()
-            self.selector_path.setCurrentIndex(self.selector_path.count()-1)
+        if folder and not self.busy:
+            self.run_job(partial(Job, lambda job: self.rd.add_rom_folder(folder)), then=self.rom_folder_added)
+
+    def rom_folder_added(self):
+        self.update_paths()
+        self.selector_path.setCurrentIndex(self.selector_path.count()-1)
 
     def set_target_folder(self, path: str = None):
         p = QFileDialog.getExistingDirectory(self, 'Select Folder').replace('/', '\\') if not path else path
@@ -320,13 +491,17 @@ class MainWindow(QMainWindow):
 
     def set_steam_folder(self):
         p = QFileDialog.getExistingDirectory(self, 'Select Steam Folder').replace('/', '\\')
-        if p:
-            self.rd.add_steam_folder(p)
-            self.steam_folder.setText(self.rd.steam_folder)
-            print(f'Info: Set Steam folder to {self.rd.steam_folder}')
-            self.index_all()
+        if p and not self.busy:
+            self.run_job(partial(Job, lambda job: self.rd.add_steam_folder(p)), then=self.steam_folder_set)
+
+    def steam_folder_set(self):
+        self.steam_folder.setText(self.rd.steam_folder)
+        print(f'Info: Set Steam folder to {self.rd.steam_folder}')
+        self.index_all()
 
     def remove_steam_folder(self):
+        if self.busy:
+            return
         if self.steam_folder and self.confirm_prompt('Confirm removal', 'Remove Steam folder?'):
             self.rd.remove_steam_folder()
             self.steam_folder.setText(self.rd.steam_folder)
@@ -361,12 +536,17 @@ class MainWindow(QMainWindow):
         new_platform = None if text == 'None' else [p for p in PLATFORMS.values() if p.name == text][0]  # Get platform from name
         p_id = new_platform.id if hasattr(new_platform, 'id') else 'None'  # Get ID from platform
         if not hasattr(self.rd.platforms[self.selected_path], 'id') or self.rd.platforms[self.selected_path].id != p_id:
-            self.rd.specify_platform(self.selected_path, new_platform)  # Update platform in Rom Detective
-            self.index_all()
+            if self.busy:
+                self.select_path(self.selected_path)  # Revert selector_platform to the current platform
+                return
+            path = self.selected_path
+            # Update platform in Rom Detective (re-indexing the path) in the background
+            self.run_job(partial(Job, lambda job: self.rd.specify_platform(path, new_platform)),
+                         then=self.index_all)
         self.selector_path.setItemText(self.selector_path.currentIndex(), f'{self.selected_path} [{p_id}]')  # Update label for path
 
     def remove_platform(self):
-        if not self.selected_path:  # Will crash if there's no path selected
+        if not self.selected_path or self.busy:  # Will crash if there's no path selected
             return
         if self.confirm_prompt('Confirm removal', f'Remove {self.selected_path}?'):
             self.rd.remove_folder(self.selected_path)
@@ -375,15 +555,22 @@ class MainWindow(QMainWindow):
             self.index_all()
 
     def update_console(self, text):
-        """Append text to the QTextEdit."""
-        color = '#fff'
-        c_warning = '#ff00ff'
-        c_info = '#0099ff'
-        if text.lower().startswith('warning'): color = c_warning
-        elif text.lower().startswith('info'): color = c_info
-        elif text.lower().startswith('blacklist'): color = c_info
-        self.console.setTextColor(QColor(color))
-        self.console.insertPlainText(text)
+        """Append a batch of lines to the QTextEdit, one insert per run of lines with the same color"""
+        lines = text.splitlines(keepends=True)
+        levels = [_console_level(line) for line in lines]
+        self.console_counts.update(level for level in levels if level)
+        self.console_levels.setText(f'{self.console_counts["warning"] + self.console_counts["error"]} warnings, '
+                                    f'{self.console_counts["info"]} info')
+
+        # Lines beyond the scrollback would be dropped right away, only counted
+        lines, levels = lines[-CONSOLE_SCROLLBACK:], levels[-CONSOLE_SCROLLBACK:]
+        self.console.moveCursor(QTextCursor.MoveOperation.End)
+        start = 0
+        for i in range(1, len(lines) + 1):
+            if i == len(lines) or CONSOLE_COLORS.get(levels[i]) != CONSOLE_COLORS.get(levels[start]):
+                self.console.setTextColor(QColor(CONSOLE_COLORS.get(levels[start], '#fff')))
+                self.console.insertPlainText(''.join(lines[start:i]))
+                start = i
         self.console.ensureCursorVisible()
 
 
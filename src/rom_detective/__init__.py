@@ -15,6 +15,7 @@ ROOT_FOLDER = os.path.dirname(sys.executable) \
 MEI_FOLDER = sys._MEIPASS if hasattr(sys, '_MEIPASS') else f'{ROOT_FOLDER}\\src'
 DATA_FOLDER = f'{MEI_FOLDER}\\data'
 CONF_FOLDER = f'{ROOT_FOLDER}\\config'
+CACHE_FOLDER = f'{CONF_FOLDER}\\cache'
 LOGS_FOLDER = f'{ROOT_FOLDER}\\logs'
 
 
@@ -44,6 +45,7 @@ def initialize_folder(path: str = ROOT_FOLDER) -> bool:
     blacklist_cfg = Path(f'{config_folder}\\blacklist.cfg')
     blacklist_cfg_content = (
         "# Path to ROMs or games that weren't invited.\n"
+        "# Folders (ending with \\) and wildcards (*) are also accepted.\n"
         "# Example:\n"""
         "# C:\\ROMs\\n64\\My Rom File.z64\""
     )
@@ -51,6 +53,7 @@ def initialize_folder(path: str = ROOT_FOLDER) -> bool:
     whitelist_cfg = Path(f'{config_folder}\\whitelist.cfg')
     whitelist_cfg_content = (
         "# Path to ROMs or games that originally weren't allowed in, but allowed in by you. (Copy the source from blacklist)\n"
+        "# Folders (ending with \\) and wildcards (*) are also accepted.\n"
         "# Example:\n"""
         "# C:\\ROMs\\n64\\My Rom File.z64\""
     )
@@ -0,0 +1,157 @@
+"""
+Command line interface
+======================
+Headless entry point, driven by config\\config.cfg (only imports the core package, never Qt)
+
+    python -m rom_detective index      Index every folder in the config
+    python -m rom_detective dry-run    Simulate creating the shortcuts
+    python -m rom_detective create     Create (sync) the shortcuts
+    python -m rom_detective list       List the indexed games
+    python -m rom_detective stats      Amount of games per folder
+    python -m rom_detective report     Compare the latest runs against the ones before (logs\\history.jsonl)
+    python -m rom_detective watch      Keep the index and shortcuts up to date while the folders change (Ctrl+C)
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+
+from rom_detective import CONF_FOLDER, LOGS_FOLDER, initialize_folder
+from rom_detective.const import PLATFORMS
+from rom_detective.history import RunHistory
+from rom_detective.instrumentation import INSTRUMENTS
+from rom_detective.rom_detective import RomDetective, RDFlag
+from rom_detective.watch import Watcher
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='rom_detective', description='Game and ROM Shortcuts Manager')
+    parser.add_argument('--config', default=f'{CONF_FOLDER}\\config.cfg',
+                        help='config file to use (default: config\\config.cfg)')
+    parser.add_argument('--no-cache', action='store_true', help='do not use the index cache')
+    parser.add_argument('--serial', action='store_true', help='index one folder at a time')
+    parser.add_argument('--instrument', action='store_true', help='print the time spent in every phase')
+    parser.add_argument('--trace-memory', action='store_true', help='--instrument, including peak memory (slower)')
+    parser.add_argument('--logs', default=LOGS_FOLDER,
+                        help='folder of the logs, the journal and the run history (default: logs)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('index', help='index every folder in the config')
+    commands.add_parser('dry-run', help='simulate creating the shortcuts')
+    create = commands.add_parser('create', help='create the shortcuts')
+    create.add_argument('--full', action='store_true',
+                        help='write every shortcut, instead of only the changes since the previous run')
+    create.add_argument('--workers', type=int, default=8, help='amount of threads writing shortcuts (default: 8)')
+
+    list_games = commands.add_parser('list', help='list the indexed games')
+    list_games.add_argument('--blacklisted', action='store_true', help='list the blacklisted games instead')
+    list_games.add_argument('--platform', help='only list games of a platform id (n64)')
+    list_games.add_argument('--path', help='only list games of a folder in the config')
+
+    commands.add_parser('stats', help='amount of games per folder')
+
+    report = commands.add_parser('report', help='flag regressions of the latest runs against the runs before')
+    report.add_argument('--window', type=int, default=5, help='amount of earlier runs to compare to (default: 5)')
+    report.add_argument('--threshold', type=float, default=0.2,
+                        help='flag throughput drops above this fraction (default: 0.2)')
+    report.add_argument('--count-threshold', type=float, default=0.05,
+                        help='flag count drops above this fraction (default: 0.05)')
+
+    watch = commands.add_parser('watch', help='keep the index and shortcuts up to date while the folders change')
+    watch.add_argument('--interval', type=float, default=2.0, help='seconds between polls (default: 2)')
+    watch.add_argument('--debounce', type=float, default=1.0,
+                       help='seconds without changes before re-indexing (default: 1)')
+    watch.add_argument('--poll', action='store_true', help='poll the folders, even if watchdog is installed')
+    watch.add_argument('--batch', type=int, default=1000, help='directories to check per poll (default: 1000)')
+    return parser
+
+
+def load(args: argparse.Namespace) -> RomDetective:
+    """Returns a RomDetective with the config loaded and everything indexed"""
+    if args.config == f'{CONF_FOLDER}\\config.cfg':
+        initialize_folder()
+    rd = RomDetective()
+    if args.instrument or args.trace_memory:
+        rd.enable_instrumentation(memory=args.trace_memory)
+    rd.load_config(args.config)
+    rd.logs_folder = args.logs
+    rd.enable_history(args.logs)
+    if not args.no_cache:
+        # Next to the config file in use
+        index_db = f'{os.path.dirname(os.path.abspath(args.config))}\\index.db'
+        try:
+            rd.enable_index_cache(index_db)
+        except (OSError, sqlite3.Error) as e:
+            print(f'Warning: Could not open the index cache {index_db} ({e}), indexing without it')
+    rd.index_all(parallel=not args.serial)
+    return rd
+
+
+def print_games(rd: RomDetective, args: argparse.Namespace) -> None:
+    status = RDFlag.BLACKLISTED if args.blacklisted else RDFlag.INDEXED
+    platform = PLATFORMS[args.platform] if args.platform else None
+    for game in rd.query(status, platform=platform, path=args.path):
+        print(f'[{game.platform.id}]: {game.title}' + (f' ["{game.source}"]' if args.blacklisted else ''))
+
+
+def print_stats(rd: RomDetective) -> None:
+    for path, platform in rd.platforms.items():
+        if platform:
+            print(f'{platform.name} ({path}): {rd.count(RDFlag.INDEXED, path=path)} games, '
+                  f'{rd.count(RDFlag.BLACKLISTED, path=path)} blacklisted')
+    print(f'{rd.count(RDFlag.INDEXED)}/{len(rd.games)} games total over {len(rd.platforms)} platforms')
+
+
+def print_report(args: argparse.Namespace) -> int:
+    """Prints the regressions of the latest runs, returns 3 if there are any"""
+    history = RunHistory(args.logs)
+    if not history.records():
+        print(f'Info: No runs recorded in {history.path}')
+        return 0
+    regressions = history.report(window=args.window, threshold=args.threshold, count_threshold=args.count_threshold)
+    for kind in dict.fromkeys(record['kind'] for record in history.records()):
+        latest = history.records(kind)[-1]
+        print(f'Info: Latest {kind} run ({latest["timestamp"]}): '
+              + ', '.join(f'{name}={value}' for name, value in latest['counts'].items()))
+    [print(f'Regression: {regression}') for regression in regressions]
+    if not regressions:
+        print('Info: No regressions')
+    return 3 if regressions else 0
+
+
+def main(argv: list[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == 'report':
+        return print_report(args)
+    if args.command == 'list' and args.platform and args.platform not in PLATFORMS:
+        print(f'Error: Unknown platform {args.platform}', file=sys.stderr)
+        return 2
+
+    try:
+        rd = load(args)
+    except Warning as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    if args.command == 'index':
+        print(f'Info: {len(rd.games)} games found over {len(rd.platforms)} platforms.')
+    elif args.command == 'dry-run':
+        rd.create_shortcuts(dry_run=True, sync=True)
+    elif args.command == 'create':
+        rd.create_shortcuts(workers=args.workers, sync=not args.full)
+    elif args.command == 'list':
+        print_games(rd, args)
+    elif args.command == 'stats':
+        print_stats(rd)
+    elif args.command == 'watch':
+        Watcher(rd, debounce=args.debounce, interval=args.interval, events=not args.poll, batch=args.batch).run()
+
+    # create and dry-run print the phases with their log summary
+    if INSTRUMENTS.enabled and args.command not in ['create', 'dry-run']:
+        print(INSTRUMENTS)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,276 @@
+__all__ = ['IndexCache']
+
+import hashlib
+import os
+import sqlite3
+import threading
+
+from rom_detective import CONF_FOLDER
+from rom_detective.instrumentation import timed
+from rom_detective.item import FolderRules, Item, folder_rules, item_from_record
+from rom_detective.platforms import Platform
+from rom_detective.sanitize import SANITIZER
+from rom_detective.util import walk_listings
+import rom_detective.const as const
+
+SCHEMA_VERSION = 4
+
+# A fresh listing: depth, mtime and its [(entry name, entry size, dependency mtime, item)]
+Listing = tuple[int, float, list[tuple[str, int, float, Item]]]
+
+
+"""
+IndexCache
+==========
+A persistent (SQLite) index of previously scanned ROM folders
+
+For every indexed root the cache holds:
+    'roots': the platform id the root was indexed as and the fingerprint of its rules (see _fingerprint)
+    'directories': every directory listed below the root, its depth and its mtime
+    'items': the resulting Item fields (Item.to_record), the directory and the entry (name and size) they were
+             listed from, and the file they depend on (Item.dependency, e.g. a Wii U meta.xml) and its mtime
+
+The mtimes are recorded during the indexing walk itself (FolderRules, one listing per directory).
+On re-index every stored directory is stat'ed once and only the directories whose mtime changed are listed again
+(adding, removing or renaming an entry changes the mtime of its directory), new subdirectories are walked
+and vanished ones dropped. The items of every other directory are rehydrated from the store.
+Within a re-listed directory the items of entries with an unchanged size are reused as well.
+
+Dependencies don't change the mtime of the directory of their item, they are stat'ed on every re-index and
+the directories of the changed ones are listed again. A root is walked from scratch if its fingerprint changed
+(the platform's extensions, the sanitize rules or the databases its items are read from).
+Blacklist/whitelist rules are not stored, they are applied to the items on rehydration.
+"""
+
+
+def _directory_key(directory: str) -> list[str]:
+    """Orders directories like a (case-insensitive, sorted) depth first walk: parents before their children"""
+    return directory.lower().split('\\')
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _size(entry: os.DirEntry) -> int:
+    """Size of a file entry, None for directories"""
+    try:
+        return entry.stat().st_size if entry.is_file() else None
+    except OSError:
+        return None
+
+
+def _fingerprint(platform: Platform, rules: FolderRules) -> str:
+    """Digest of everything besides the files themselves the items of a root are derived from"""
+    parts = [platform.id, platform.flag, *platform.extensions, SANITIZER.fingerprint,
+             *(getattr(const.DATABASES, database).digest.hex() for database in rules.databases)]
+    return hashlib.blake2b('\0'.join(parts).encode(), digest_size=16).hexdigest()
+
+
+def _record(item: Item) -> tuple:
+    """The stored fields of an item: (kind, source, platform, filename, g_id, forced_blacklist)"""
+    record = item.to_record()
+    return (record['kind'], record['source'], record['platform'], record['filename'],
+            record.get('g_id', ''), record['_forced_blacklist'])
+
+
+def _rehydrate(record: tuple) -> Item:
+    """Rebuilds an item from the stored (kind, source, platform, filename, g_id, forced_blacklist)"""
+    kind, source, platform, filename, g_id, forced = record
+    item = item_from_record({'kind': kind, 'source': source, 'platform': platform, 'filename': filename,
+                             'g_id': g_id, '_forced_blacklist': bool(forced), 'clean_brackets': False})
+    item.apply_rules()
+    return item
+
+
+class IndexCache:
+    """IndexCache Class"""
+    def __init__(self, path: str = f'{CONF_FOLDER}\\index.db'):
+        self.path = path
+        self.hits = 0  # roots without any changed directory
+        self.misses = 0  # roots (partially) walked
+        self.listed = 0  # directories listed on a miss
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Shared between the threads of a parallel index, queries are done while holding the lock
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._create_tables()
+
+    def _create_tables(self) -> None:
+        """Creates the tables, dropping any existing tables from an older schema"""
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            self.db.executescript('DROP TABLE IF EXISTS roots;'
+                                  'DROP TABLE IF EXISTS directories;'
+                                  'DROP TABLE IF EXISTS items;')
+        self.db.executescript(
+            'CREATE TABLE IF NOT EXISTS roots (path TEXT PRIMARY KEY, platform TEXT, fingerprint TEXT);'
+            'CREATE TABLE IF NOT EXISTS directories (root TEXT, path TEXT, depth INTEGER, mtime REAL);'
+            'CREATE TABLE IF NOT EXISTS items (root TEXT, directory TEXT, position INTEGER, entry TEXT, size INTEGER,'
+            '                                  kind TEXT, source TEXT, platform TEXT, filename TEXT, g_id TEXT,'
+            '                                  forced_blacklist INTEGER, dependency TEXT, dependency_mtime REAL);'
+            'CREATE INDEX IF NOT EXISTS directories_root ON directories (root, path);'
+            'CREATE INDEX IF NOT EXISTS items_root ON items (root, directory);'
+            f'PRAGMA user_version = {SCHEMA_VERSION};'
+        )
+        self.db.commit()
+
+    def _stored(self, root: str, platform: Platform, fingerprint: str) -> dict[str, tuple[int, float]]:
+        """
+        Returns the stored {directory: (depth, mtime)} of a root,
+        empty if it was stored for another platform or with another fingerprint
+        """
+        with self._lock:
+            row = self.db.execute('SELECT platform, fingerprint FROM roots WHERE path = ?', (root,)).fetchone()
+            rows = self.db.execute('SELECT path, depth, mtime FROM directories WHERE root = ?', (root,)).fetchall()
+        if not row or row != (platform.id, fingerprint):
+            return dict()
+        return {directory: (depth, mtime) for directory, depth, mtime in rows}
+
+    def _load(self, root: str, directories: set[str]) -> dict[str, list[Item]]:
+        """Rehydrates the stored items of the given directories of a root"""
+        with self._lock:
+            rows = self.db.execute('SELECT directory, kind, source, platform, filename, g_id, forced_blacklist '
+                                   'FROM items WHERE root = ? ORDER BY position', (root,)).fetchall()
+        items = {directory: list() for directory in directories}
+        for directory, *record in rows:
+            if directory in items:
+                items[directory].append(_rehydrate(record))
+        return items
+
+    def _entries(self, root: str, directory: str) -> dict[str, list[tuple]]:
+        """Returns the stored {entry: [(size, dependency, dependency mtime, record)]} of a directory"""
+        with self._lock:
+            rows = self.db.execute('SELECT entry, size, dependency, dependency_mtime, '
+                                   'kind, source, platform, filename, g_id, forced_blacklist '
+                                   'FROM items WHERE root = ? AND directory = ? ORDER BY position',
+                                   (root, directory)).fetchall()
+        entries = dict()
+        for entry, size, dependency, dependency_mtime, *record in rows:
+            entries.setdefault(entry, list()).append((size, dependency, dependency_mtime, record))
+        return entries
+
+    def _stale_dependencies(self, root: str) -> set[str]:
+        """Returns the stored directories of a root containing items whose dependency changed (or vanished)"""
+        with self._lock:
+            rows = self.db.execute('SELECT DISTINCT directory, dependency, dependency_mtime FROM items '
+                                   'WHERE root = ? AND dependency IS NOT NULL', (root,)).fetchall()
+        return {directory for directory, dependency, mtime in rows if _mtime(dependency) != mtime}
+
+    def _items(self, rules: FolderRules, directory: str, entries: list[os.DirEntry],
+               stored: dict[str, list[tuple]]) -> list[tuple[str, int, float, Item]]:
+        """
+        Returns the [(entry name, size, dependency mtime, item)] of a listing,
+        reusing the stored items of entries whose size and dependencies didn't change
+        """
+        items = list()
+        for entry in entries:
+            size = _size(entry)
+            known = stored.get(entry.name)
+            if known and all(s == size and (d is None or _mtime(d) == m) for s, d, m, _ in known):
+                items += [(entry.name, size, mtime, _rehydrate(record)) for _, _, mtime, record in known]
+                continue
+            items += [(entry.name, size, item.dependency and _mtime(item.dependency), item)
+                      for item in rules.items(directory, [entry])]
+        return items
+
+    def _list(self, root: str, rules: FolderRules, directory: str, depth: int = 1,
+              skip: dict = None) -> dict[str, Listing]:
+        """Walks a directory (except the known subdirectories in skip), returns {directory: (depth, mtime, items)}"""
+        listings = dict()
+        for path, depth, mtime, entries in walk_listings(directory, rules.max_depth, rules.prune,
+                                                         depth=depth, skip=skip or dict()):
+            stored = self._entries(root, path) if skip else dict()
+            listings[path] = depth, mtime, self._items(rules, path, entries, stored)
+        with self._lock:
+            self.listed += len(listings)
+        return listings
+
+    def _store(self, root: str, platform: Platform, fingerprint: str, listings: dict[str, Listing],
+               dropped: set[str] = None) -> None:
+        """
+        Stores fresh listings of a root, replacing the stored directories in dropped
+        (every stored entry of the root if dropped is None)
+        """
+        with self._lock:
+            if dropped is None:
+                self._drop(root)
+                self.db.execute('INSERT INTO roots VALUES (?, ?, ?)', (root, platform.id, fingerprint))
+            else:
+                self.db.executemany('DELETE FROM directories WHERE root = ? AND path = ?',
+                                    ((root, directory) for directory in dropped))
+                self.db.executemany('DELETE FROM items WHERE root = ? AND directory = ?',
+                                    ((root, directory) for directory in dropped))
+            self.db.executemany('INSERT INTO directories VALUES (?, ?, ?, ?)',
+                                ((root, directory, depth, mtime) for directory, (depth, mtime, _) in listings.items()))
+            self.db.executemany('INSERT INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                ((root, directory, position, entry, size, *_record(item), item.dependency, mtime)
+                                 for directory, (_, _, items) in listings.items()
+                                 for position, (entry, size, mtime, item) in enumerate(items)))
+            self.db.commit()
+
+    def _drop(self, root: str) -> None:
+        for table, column in [('roots', 'path'), ('directories', 'root'), ('items', 'root')]:
+            self.db.execute(f'DELETE FROM {table} WHERE {column} = ?', (root,))
+
+    def drop(self, root: str) -> None:
+        """Removes every stored entry of a root"""
+        with self._lock:
+            self._drop(root)
+            self.db.commit()
+
+    @staticmethod
+    def _changed(stored: dict[str, tuple[int, float]], directories: set[str] = None) -> set[str]:
+        """
+        Returns the stored directories whose mtime changed, vanished directories (mtime None) included
+
+        directories: only check these (known to be touched, e.g. by a Watcher) and everything below the vanished ones
+        """
+        if directories is None:
+            return {directory for directory, (_, mtime) in stored.items() if _mtime(directory) != mtime}
+        mtimes = {directory: _mtime(directory) for directory in directories if directory in stored}
+        changed = {directory for directory, mtime in mtimes.items() if mtime != stored[directory][1]}
+        vanished = tuple(f'{directory}\\' for directory in changed if mtimes[directory] is None)
+        return changed | {directory for directory in stored if vanished and directory.startswith(vanished)}
+
+    @timed('index_cache')
+    def index(self, root: str, platform: Platform, directories: set[str] = None) -> list[Item]:
+        """
+        Returns the items of a ROM folder (root), indexed by the FolderRules of its platform
+
+        Unchanged directories are rehydrated from the store (a hit if none changed),
+        changed or new directories are listed and stored (a miss)
+
+        Optional flag: directories: set (default: None) the directories known to be touched,
+                       only these are checked instead of every stored directory
+        """
+        rules = folder_rules(platform)
+        fingerprint = _fingerprint(platform, rules)
+        stored = self._stored(root, platform, fingerprint)
+        changed = self._changed(stored, directories) | (self._stale_dependencies(root) if stored else set())
+        if stored and not changed:
+            with self._lock:
+                self.hits += 1
+            items = self._load(root, set(stored))
+            return [item for directory in sorted(items, key=_directory_key) for item in items[directory]]
+
+        with self._lock:
+            self.misses += 1
+        if not stored:
+            listings = self._list(root, rules, root)
+            self._store(root, platform, fingerprint, listings)
+        else:
+            listings = dict()
+            for directory in sorted(changed, key=_directory_key):
+                listings.update(self._list(root, rules, directory, stored[directory][0], skip=stored))
+            self._store(root, platform, fingerprint, listings, dropped=changed)
+
+        items = self._load(root, set(stored) - changed)
+        items.update({directory: [item for *_, item in listing[2]] for directory, listing in listings.items()})
+        return [item for directory in sorted(items, key=_directory_key) for item in items[directory]]
+
+    def close(self) -> None:
+        self.db.close()
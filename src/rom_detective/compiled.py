@@ -0,0 +1,57 @@
+__all__ = ['compiled_path', 'load_compiled', 'source_digest']
+
+import hashlib
+import os
+import pickle
+from typing import Callable
+
+from rom_detective import CACHE_FOLDER
+
+
+def source_digest(source: str) -> bytes:
+    """
+    Returns a hash of the content of a source file
+
+    Compiled copies are keyed on the content rather than the mtime, the one-file build extracts
+    its data folder (with new mtimes) on every launch
+    """
+    with open(source, 'rb') as file:
+        return hashlib.blake2b(file.read(), digest_size=16).digest()
+
+
+def compiled_path(source: str, folder: str, extension: str) -> str:
+    """
+    Returns <folder>\\<source filename>-<digest of the source path><extension>
+
+    The path digest keeps sources sharing a filename (e.g. a custom data folder) apart
+    """
+    digest = hashlib.blake2b(os.path.abspath(source).encode(), digest_size=4).hexdigest()
+    return f'{folder}\\{os.path.basename(source)}-{digest}{extension}'
+
+
+def load_compiled(source: str, loader: Callable[[str], any], folder: str = CACHE_FOLDER) -> any:
+    """
+    Returns loader(source), parsed data gets pickled to <folder>\\<source filename>-<path digest>.pickle
+    and is reused for as long as the source file keeps the same content
+
+    If the cache folder isn't writable, the source is simply parsed every time
+    """
+    digest = source_digest(source)
+    compiled = compiled_path(source, folder, '.pickle')
+
+    try:
+        with open(compiled, 'rb') as file:
+            compiled_digest, data = pickle.load(file)
+        if compiled_digest == digest:
+            return data
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+
+    data = loader(source)
+    try:
+        os.makedirs(folder, exist_ok=True)
+        with open(compiled, 'wb') as file:
+            pickle.dump((digest, data), file, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:  # pragma: no cover
+        pass
+    return data
@@ -1,6 +1,50 @@
+import threading
+from collections.abc import Mapping
+from functools import cache
+from typing import Callable
+
 from rom_detective import DATA_FOLDER
-from rom_detective.platforms import import_platforms
+from rom_detective.platforms import AliasIndex, Platform, import_platforms
 from rom_detective.databases import DatabaseFiles
 
-PLATFORMS = {platform.id: platform for platform in import_platforms(f'{DATA_FOLDER}\\platforms.yaml')}
+
+class LazyMapping(Mapping):
+    """A read-only dict that is only loaded (once) when it is first accessed"""
+    def __init__(self, loader: Callable[[], dict]):
+        self._loader = loader
+        self._data = None
+        self._lock = threading.Lock()
+
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data = self._loader()
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def copy(self) -> dict:
+        return self.data.copy()
+
+
+def _load_platforms() -> dict[str, Platform]:
+    return {platform.id: platform for platform in import_platforms(f'{DATA_FOLDER}\\platforms.yaml')}
+
+
+PLATFORMS: Mapping[str, Platform] = LazyMapping(_load_platforms)
+
+
+@cache
+def alias_index() -> AliasIndex:
+    """The AliasIndex of PLATFORMS, built once when a path is first identified"""
+    return AliasIndex(PLATFORMS.values())
 DATABASES = DatabaseFiles()
@@ -1,22 +1,157 @@
-__all__ = ['DatabaseFiles']
+__all__ = ['DatabaseFiles', 'CompactDatabase', 'compile_database', 'open_database']
 
+import mmap
+import os
+import struct
+from collections.abc import Mapping
 from dataclasses import dataclass
-from rom_detective import DATA_FOLDER
+from functools import cached_property
+from typing import Iterator
 
+from rom_detective import DATA_FOLDER, CACHE_FOLDER
+from rom_detective.compiled import compiled_path, source_digest
 
-def _load_db(path: str) -> dict:
+
+"""
+Compact databases
+=================
+Text databases (key=value format) get compiled into a binary file which is memory-mapped,
+nothing but the header is read on startup and lookups are a binary search over the mapped file
+
+Layout (little-endian):
+    header: magic (4s), source digest (16s, see source_digest), count (I), key width (I)
+    keys: <count> sorted keys, utf-8 and padded with null bytes to <key width>
+    offsets: <count + 1> offsets (I) into the titles
+    titles: utf-8 titles, back to back
+"""
+
+MAGIC = b'RDB2'
+HEADER = struct.Struct('<4s16sII')
+
+
+def _parse_db(path: str) -> dict:
     """Takes a database filepath (key=value format) and returns a dict ({key:value})"""
-    return {entry.split('=')[0]: entry.split('=')[1]
-            for entry in open(path, "r", encoding='utf8')
-            if not entry.startswith('#')}
+    return {key: value.strip()
+            for key, _, value in (entry.partition('=') for entry in open(path, "r", encoding='utf8'))
+            if not key.startswith('#') and value}
+
+
+def _compile(entries: dict, digest: bytes) -> bytes:
+    """Compiles a dict of {key: title} into the compact format"""
+    keys = sorted(key.encode('utf8') for key in entries)
+    width = max((len(key) for key in keys), default=0)
+    titles = [entries[key.decode('utf8')].encode('utf8') for key in keys]
+
+    offsets = [0]
+    for title in titles:
+        offsets.append(offsets[-1] + len(title))
+
+    return b''.join([HEADER.pack(MAGIC, digest, len(keys), width),
+                     b''.join(key.ljust(width, b'\0') for key in keys),
+                     struct.pack(f'<{len(offsets)}I', *offsets),
+                     b''.join(titles)])
+
+
+def compile_database(source: str, destination: str) -> None:
+    """Converts a text database (key=value format) into a compact database file"""
+    data = _compile(_parse_db(source), source_digest(source))
+    with open(f'{destination}.tmp', 'wb') as file:
+        file.write(data)
+    os.replace(f'{destination}.tmp', destination)
+
+
+class CompactDatabase(Mapping):
+    """
+    Read-only {key: title} mapping over a compiled database (bytes or mmap)
+    Lookups are a binary search over the sorted fixed-width keys
+    """
+    def __init__(self, buffer: bytes | mmap.mmap):
+        magic, self.digest, self.count, self.width = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a compiled database')
+        self.buffer = buffer
+        self._keys = HEADER.size
+        self._offsets = self._keys + self.count * self.width
+        self._titles = self._offsets + (self.count + 1) * 4
+
+    def _key(self, index: int) -> bytes:
+        start = self._keys + index * self.width
+        return self.buffer[start:start + self.width]
+
+    def _find(self, key: str) -> int:
+        """Returns the index of a key, or -1 if it isn't in the database"""
+        needle = key.encode('utf8')
+        if len(needle) > self.width:
+            return -1
+        needle = needle.ljust(self.width, b'\0')
+
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < needle:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < self.count and self._key(low) == needle else -1
+
+    def __getitem__(self, key: str) -> str:
+        index = self._find(key) if isinstance(key, str) else -1
+        if index < 0:
+            raise KeyError(key)
+        start, end = struct.unpack_from('<2I', self.buffer, self._offsets + index * 4)
+        return self.buffer[self._titles + start:self._titles + end].decode('utf8')
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._key(index).rstrip(b'\0').decode('utf8') for index in range(self.count))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def open_database(source: str, folder: str = CACHE_FOLDER) -> CompactDatabase:
+    """
+    Returns a memory-mapped CompactDatabase of a text database,
+    compiled to <folder>\\<source filename>-<path digest>.db when missing or outdated (content digest)
+
+    If the compiled file can't be written, the database is compiled in memory instead
+    """
+    digest = source_digest(source)
+    compiled = compiled_path(source, folder, '.db')
+
+    for attempt in range(2):
+        try:
+            with open(compiled, 'rb') as file:
+                database = CompactDatabase(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+            if database.digest == digest:
+                return database
+            database.buffer.close()
+        except (OSError, ValueError, struct.error):
+            pass
+
+        if attempt == 0:
+            try:
+                os.makedirs(folder, exist_ok=True)
+                compile_database(source, compiled)
+            except OSError:  # pragma: no cover
+                break
+
+    return CompactDatabase(_compile(_parse_db(source), digest))  # pragma: no cover
 
 
 @dataclass
 class DatabaseFiles:
     """
-    DatabaseFiles
-        .gameslist_ps3 = dict(game_id:full_title)
-        .blacklist_steam_software = dict(steam_id:full_title)
+    DatabaseFiles (each database is opened when it is first used)
+        .gameslist_ps3 = CompactDatabase(game_id:full_title)
+        .blacklist_steam_software = CompactDatabase(steam_id:full_title)
     """
-    gameslist_ps3 = _load_db(f'{DATA_FOLDER}\\gameslist_ps3.txt')
-    blacklist_steam_software = _load_db(f'{DATA_FOLDER}\\blacklist_steam_software.txt')
+    @cached_property
+    def gameslist_ps3(self) -> CompactDatabase:
+        return open_database(f'{DATA_FOLDER}\\gameslist_ps3.txt')
+
+    @cached_property
+    def blacklist_steam_software(self) -> CompactDatabase:
+        return open_database(f'{DATA_FOLDER}\\blacklist_steam_software.txt')
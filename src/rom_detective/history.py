@@ -0,0 +1,114 @@
+__all__ = ['RunHistory', 'Regression']
+
+import json
+import statistics
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from rom_detective import LOGS_FOLDER
+
+
+"""
+RunHistory
+==========
+An append-only store of run metrics (JSON Lines, <LOGS_FOLDER>\\history.jsonl), one record per run:
+    kind: 'index' (index_all) or 'shortcuts' (create_shortcuts)
+    timestamp: when the run finished
+    phases: {phase: {calls, seconds, items}} (the run itself, plus every instrumented phase if enabled)
+    counts: {name: amount} (games, indexed, blacklisted, games per platform id, active/removed shortcuts)
+
+report() compares the latest run of every kind against the median of the runs before it (rolling baseline),
+flagging phases whose throughput (items/second) dropped and the counts in DROP_METRICS that dropped
+(counts like 'removed' or 'blacklisted' are expected to go up and down)
+"""
+
+# Counts where a drop means games or shortcuts went missing, 'platform:' covers the games of every platform
+DROP_METRICS = ['games', 'indexed', 'shortcuts', 'platform:']
+
+
+def _is_drop_metric(name: str) -> bool:
+    return any(name == metric or metric.endswith(':') and name.startswith(metric) for metric in DROP_METRICS)
+
+
+@dataclass
+class Regression:
+    kind: str
+    metric: str
+    value: float
+    baseline: float
+
+    @property
+    def change(self) -> float:
+        """Relative change against the baseline (-0.25 = 25% lower)"""
+        return self.value / self.baseline - 1
+
+    def __str__(self) -> str:
+        return f'{self.kind}: {self.metric} dropped {-self.change:.0%} ({self.value:.1f} vs {self.baseline:.1f})'
+
+
+class RunHistory:
+    """RunHistory Class"""
+    def __init__(self, path_dir: str = LOGS_FOLDER):
+        self.path = f'{path_dir}\\history.jsonl'
+        self.path_dir = path_dir
+
+    def append(self, kind: str, phases: dict[str, dict], counts: dict[str, int]) -> dict:
+        """Appends the record of a run, returns the record"""
+        record = {'kind': kind,
+                  'timestamp': datetime.now().isoformat(timespec='seconds'),
+                  'phases': phases,
+                  'counts': counts}
+        Path(self.path_dir).mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(record) + '\n')
+        return record
+
+    def records(self, kind: str = None) -> list[dict]:
+        """Returns the stored records (of a kind), oldest first"""
+        try:
+            lines = open(self.path, 'r', encoding='utf-8').read().split('\n')
+        except FileNotFoundError:
+            return list()
+        records = list()
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # Empty or cut off line
+        return [record for record in records if kind is None or record.get('kind') == kind]
+
+    def report(self, window: int = 5, threshold: float = 0.2, count_threshold: float = 0.05) -> list[Regression]:
+        """
+        Compares the latest run of every kind against the median of up to <window> runs before it
+
+        Flags phases whose throughput (items/second) dropped by more than <threshold>,
+        and counts in DROP_METRICS that dropped by more than <count_threshold>
+        """
+        regressions, records = list(), self.records()
+        for kind in dict.fromkeys(record['kind'] for record in records):
+            *previous, latest = [record for record in records if record['kind'] == kind]
+            baseline = previous[-window:]
+            if not baseline:
+                continue
+
+            for phase, totals in latest['phases'].items():
+                throughputs = [_throughput(record['phases'][phase]) for record in baseline
+                               if phase in record['phases']]
+                throughputs = [throughput for throughput in throughputs if throughput]
+                value = _throughput(totals)
+                if throughputs and value is not None \
+                        and value < statistics.median(throughputs) * (1 - threshold):
+                    regressions.append(Regression(kind, f'{phase} items/s', value, statistics.median(throughputs)))
+
+            names = [*latest['counts'], *(name for record in baseline for name in record['counts'])]
+            for name in filter(_is_drop_metric, dict.fromkeys(names)):
+                value = latest['counts'].get(name, 0)
+                counts = [record['counts'][name] for record in baseline if record['counts'].get(name)]
+                if counts and value < statistics.median(counts) * (1 - count_threshold):
+                    regressions.append(Regression(kind, name, value, statistics.median(counts)))
+        return regressions
+
+
+def _throughput(totals: dict) -> float:
+    return totals['items'] / totals['seconds'] if totals.get('seconds') else None
@@ -0,0 +1,154 @@
+__all__ = ['Phase', 'Instruments', 'INSTRUMENTS', 'timed']
+
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from functools import wraps
+from typing import Callable, Iterator
+
+
+"""
+Instrumentation
+===============
+Named timers and counters around the phases of a run (scanning, indexing, stats, shortcuts)
+
+Functions decorated with @timed(<name>) add to the totals of their phase while INSTRUMENTS is enabled:
+    calls: amount of calls
+    seconds: wall time spent inside the phase (nested phases are included in their parents)
+    items: amount of items returned (len() of a list result, otherwise 1 per call)
+    peak_memory: highest tracemalloc peak (bytes) above the memory in use when the phase started,
+                 only traced if enabled with memory=True (approximate when phases run in parallel)
+
+Disabled (default), a decorated function only costs a flag check per call.
+"""
+
+
+@dataclass(slots=True)
+class Phase:
+    name: str
+    calls: int = 0
+    seconds: float = 0.0
+    items: int = 0
+    peak_memory: int = None
+
+    def __str__(self) -> str:
+        peak = f'{self.peak_memory / 2 ** 20:9.1f} MiB' if self.peak_memory is not None else ''
+        return f'{self.name:<24}{self.calls:>8} calls{self.seconds:>10.3f}s{self.items:>10} items{peak}'
+
+
+class Instruments:
+    """Instruments Class"""
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.phases: dict[str, Phase] = dict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self, memory: bool = False) -> 'Instruments':
+        """Starts collecting (and optionally tracing memory), resetting any earlier totals"""
+        self.reset()
+        self.memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+        return self
+
+    def disable(self) -> None:
+        self.enabled = False
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.memory = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.phases = dict()
+
+    def _add(self, name: str, seconds: float, items: int, peak: int = None) -> None:
+        with self._lock:
+            phase = self.phases.setdefault(name, Phase(name))
+            phase.calls += 1
+            phase.seconds += seconds
+            phase.items += items
+            if peak is not None:
+                phase.peak_memory = max(phase.peak_memory or 0, peak)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[list]:
+        """
+        Times the enclosed block as a phase, yields a list to append the amount of items to:
+            with INSTRUMENTS.phase('name') as items:
+                items.append(len(...))
+        """
+        items = list()
+        if not self.enabled:
+            yield items
+            return
+
+        stack = self._local.__dict__.setdefault('stack', [])
+        frame = None
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            frame = [current, current]
+            stack.append(frame)
+
+        start = time.perf_counter()
+        try:
+            yield items
+        finally:
+            seconds = time.perf_counter() - start
+            peak = None
+            if frame:
+                stack.pop()
+                absolute = max(frame[1], tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], absolute)
+                peak = absolute - frame[0]
+            self._add(name, seconds, sum(items) if items else 1, peak)
+
+    def since(self, summary: dict[str, dict]) -> dict[str, dict]:
+        """Returns the {name: {calls, seconds, items}} added to every phase since an earlier summary()"""
+        phases = dict()
+        for name, totals in self.summary().items():
+            before = summary.get(name, {})
+            if totals['calls'] > before.get('calls', 0):
+                phases[name] = {key: totals[key] - before.get(key, 0) for key in ['calls', 'seconds', 'items']}
+        return phases
+
+    def summary(self) -> dict[str, dict]:
+        """Returns the totals of every phase, {name: {calls, seconds, items, peak_memory}}"""
+        with self._lock:
+            return {name: asdict(phase) for name, phase in self.phases.items()}
+
+    def __str__(self) -> str:
+        """String representation in console"""
+        return f"\n" \
+               f"================================================================\n" \
+               f"Phases:\n" \
+               f"================================================================\n" \
+               + ''.join(f'{phase}\n' for phase in sorted(self.phases.values(), key=lambda p: -p.seconds)) + \
+               f"================================================================\n"
+
+
+# Shared by every decorated function
+INSTRUMENTS = Instruments()
+
+
+def timed(name: str) -> Callable:
+    """Decorator, times every call of the function as the phase <name> (see Instruments)"""
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not INSTRUMENTS.enabled:
+                return function(*args, **kwargs)
+            with INSTRUMENTS.phase(name) as items:
+                result = function(*args, **kwargs)
+                items.append(len(result) if isinstance(result, list) else 1)
+            return result
+        return wrapper
+    return decorator
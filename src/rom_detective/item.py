@@ -1,31 +1,34 @@
 import os
-import re
 import vdf
 
 from pathlib import Path
+from typing import Callable
 from xml.dom import minidom
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, InitVar
 
-from rom_detective import CONF_FOLDER, ILLEGAL_CHARACTERS
+from rom_detective.instrumentation import timed
 from rom_detective.platforms import Platform, PlatformFlag
-from rom_detective.util import scan_for_files, list_subfolders
+from rom_detective.rules import RuleSet, RULES
+from rom_detective.sanitize import SANITIZER
+from rom_detective.util import walk_listings
 import rom_detective.const as const
 
 
-@dataclass
+@dataclass(slots=True)
 class Item:
     source: str
-    platform: Platform
+    platform: Platform = None  # Subclasses fill in their own platform in subclass_init
     filename: str = None
     clean_brackets: bool = True
     whitelisted: bool = False
     _blacklist: bool = field(init=False, repr=False, default=False)
+    _forced_blacklist: bool = field(init=False, repr=False, default=False)
+    rules: InitVar[RuleSet] = None
 
-    def __post_init__(self) -> None:
+    def __post_init__(self, rules: RuleSet = None) -> None:
         """Set filename from path unless specified, then sanitize the filename"""
         self.subclass_init()
-        self.blacklist(force=False)
-        self.whitelist(force=False)
+        self.apply_rules(rules)
         self.filename = self.source.split('\\')[-1] if not self.filename else self.filename
         self.sanitize_filename()
 
@@ -33,6 +36,11 @@ class Item:
         """For subclasses"""
         pass
 
+    @property
+    def dependency(self) -> str:
+        """Path to a file (besides the source) the indexed fields are read from, None if there is none"""
+        return None
+
     def __str__(self) -> str:
         """String representation"""
         return f'{self.title} ({self.platform})'
@@ -52,85 +60,67 @@ class Item:
         """Used by some ROM/Game types"""
         return False or self._blacklist
 
-    def blacklist(self, force: bool = True) -> None:
+    def blacklist(self, force: bool = True, rules: RuleSet = None) -> None:
         """Override for <blacklisted> (Manually defined)"""
         if force:
-            self._blacklist = force
+            self._blacklist = self._forced_blacklist = force
             return
-        try:
-            self._blacklist = self.source in open(f'{CONF_FOLDER}\\blacklist.cfg',
-                                                  "r", encoding='utf8').read().split('\n')
-        except FileNotFoundError as e:  # pragma: no cover
-            print(f'Warning: {e}')
-            self._blacklist = False
+        self._blacklist = self._forced_blacklist or (rules or RULES).blacklist.matches(self.source)
 
-    def whitelist(self, force: bool = True) -> None:
+    def whitelist(self, force: bool = True, rules: RuleSet = None) -> None:
         """Override for <blacklisted> (Manually defined)"""
         if force:
             self.whitelisted = force
             return
-        try:
-            self.whitelisted = self.source in open(f'{CONF_FOLDER}\\whitelist.cfg',
-                                                   "r", encoding='utf8').read().split('\n')
-        except FileNotFoundError as e:  # pragma: no cover
-            print(f'Warning: {e}')
-            self.whitelisted = False
+        self.whitelisted = (rules or RULES).whitelist.matches(self.source)
+
+    def apply_rules(self, rules: RuleSet = None) -> None:
+        """(Re)evaluates blacklist.cfg and whitelist.cfg for this item, keeps forced blacklisting"""
+        self.blacklist(force=False, rules=rules)
+        self.whitelist(force=False, rules=rules)
 
     def sanitize_filename(self) -> str:
-        """
-        Used by ROM/Game classes to reformat the filename
-
-        - 1. Moves occurrences of ', The' to the front
-        - 2. Removes illegal characters
-        - 3. (clean_brackets flag) Removes parentheses and blocks,
-                                   excluding those containing digits (Disc 1)
-                                   Useful for most platforms, but not all
-        - 4. Fix some unicode characters
-        - 5. Remove excess whitespace
-        """
-        name, ext = os.path.splitext(self.filename)
-
-        # 1. ', The' to 'The *'
-        if ', the' in name.lower():
-            name = re.sub(r', the', '', name, flags=re.IGNORECASE)
-            name = f'The {name}'
-
-        # 2. Omit illegal characters
-        name = re.sub(f'[{ILLEGAL_CHARACTERS}]', '', name)
-
-        # 3. (Optional) Remove (*) and [*] (excl. (*0-9))
-        # TODO: Find a better solution to handle parentheses?
-        name = re.sub(r'\([^\d\)]*\)|\[[^\]]*\]', '', name) if self.clean_brackets else name
-        ###
-
-        # 4. Unicode fixes
-        name = name.replace('&amp;', '&')
-
-        # 5. Excess Whitespace
-        name = re.sub('[_ ]+', ' ', name).strip()
-
-        name = f'{name}{ext}'
-        self.filename = name
+        """Used by ROM/Game classes to reformat the filename, see sanitize.Sanitizer for the rules"""
+        self.filename = SANITIZER(self.filename, self.clean_brackets)
         return self.filename
 
+    def to_record(self) -> dict:
+        """Returns the indexed fields of the item as a flat dict, see item_from_record"""
+        record = {f.name: getattr(self, f.name) for f in fields(self)}
+        record['kind'] = type(self).__name__
+        record['platform'] = self.platform.id
+        record['platform_flag'] = self.platform.flag
+        return record
+
 
 """
 Subclasses
 """
 
 
-@dataclass
+def _slotted(cls: type) -> type:
+    """
+    Like @dataclass(slots=True), but only adds slots for the fields a subclass adds
+    (before Python 3.11 dataclass re-declares every inherited slot as well, nearly doubling the instance size)
+    """
+    cls = dataclass(slots=True)(cls)
+    inherited = {slot for base in cls.__mro__[1:] for slot in getattr(base, '__slots__', ())}
+    namespace = {key: value for key, value in cls.__dict__.items() if key not in cls.__slots__}
+    namespace['__slots__'] = tuple(slot for slot in cls.__slots__ if slot not in inherited)
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_slotted
 class PS3Item(Item):
     """
     Takes a source (path) to the 9ch ROM folder
     and retrieves name from data/gameslist_ps3.txt
     """
-    platform: Platform = const.PLATFORMS['ps3']
-
     g_id: str = ''
 
     def subclass_init(self) -> None:
         """Append EBOOT.BIN path and get filename from data/gameslist_ps3.txt"""
+        self.platform = self.platform or const.PLATFORMS['ps3']
         self.g_id = self.source.split('\\')[-1]
         self.source += r'\PS3_GAME\USRDIR\EBOOT.BIN'
         try:
@@ -141,27 +131,31 @@ class PS3Item(Item):
 
     @property
     def blacklisted(self) -> bool:
-        return self.g_id not in const.DATABASES.gameslist_ps3.keys()
+        return self.g_id not in const.DATABASES.gameslist_ps3
 
 
-@dataclass
+@_slotted
 class WiiUItem(Item):
     """
     Takes a source (path) to a ROM file, see platforms.yaml,
     if ROM file is .rpx, retrieve the filename from metadata
     """
-    platform: Platform = const.PLATFORMS['wiiu']
-
     def subclass_init(self) -> None:
         """Find filename from meta.xml, if applicable"""
+        self.platform = self.platform or const.PLATFORMS['wiiu']
         if self.source.lower().endswith('.rpx') and not self.filename:
             self.filename = self._find_name_from_meta()
 
+    @property
+    def dependency(self) -> str:
+        """The 'meta.xml' of a .rpx source"""
+        return f'{Path(self.source).parents[1]}\\meta\\meta.xml' if self.source.lower().endswith('.rpx') else None
+
+    @timed('wiiu_meta')
     def _find_name_from_meta(self) -> str:
         """Finds longname_en from 'meta.xml', derived from a .rpx source path"""
         try:
-            path = f'{Path(self.source).parents[1]}\\meta\\meta.xml'
-            meta = minidom.parse(path).getElementsByTagName('longname_en')
+            meta = minidom.parse(self.dependency).getElementsByTagName('longname_en')
             new_name = meta[0].firstChild.nodeValue.replace('\n', ' ').strip()
         except FileNotFoundError:
             path = os.path.basename(Path(self.source).parents[1])
@@ -177,14 +171,13 @@ class WiiUItem(Item):
         return dlc_or_update if self.source.lower().endswith('.rpx') else False
 
 
-@dataclass
+@_slotted
 class SteamItem(Item):
     """
     source input: dict(steam_folder: game_id)
     source output: URL to steam://rungameid/<id>
     platform.flag = PlatformFlag.STEAM
     """
-    platform: Platform = const.PLATFORMS['win']
     g_id: str = ''
 
     def __str__(self) -> str:
@@ -193,11 +186,12 @@ class SteamItem(Item):
 
     def subclass_init(self) -> None:
         """Get steam game name from the .acf file and set source to the rungameid url"""
-        self.platform.flag = PlatformFlag.STEAM
+        self.platform = (self.platform or const.PLATFORMS['win']).with_flag(PlatformFlag.STEAM)
         self.filename = self.get_steam_name()
         self.source = f'URL=steam://rungameid/{self.g_id}'
         self.clean_brackets = False
 
+    @timed('steam_manifest')
     def get_steam_name(self) -> str:
         """Read the game id's appmanifest and extract name key value"""
         name = open(f'{self.source}\\steamapps\\appmanifest_{self.g_id}.acf', 'rb').read().decode('UTF-8')
@@ -206,7 +200,10 @@ class SteamItem(Item):
 
     @property
     def blacklisted(self) -> bool:
-        return True if self.g_id in const.DATABASES.blacklist_steam_software.keys() else False
+        return self.g_id in const.DATABASES.blacklist_steam_software
+
+
+ITEM_TYPES = {item_type.__name__: item_type for item_type in [Item, PS3Item, WiiUItem, SteamItem]}
 
 
 """
@@ -214,23 +211,100 @@ Functions
 """
 
 
+def item_from_record(record: dict) -> Item:
+    """
+    Rebuilds an Item (or subclass) from Item.to_record()
+
+    Skips __post_init__ entirely, meaning nothing is re-read or re-sanitized
+    """
+    item_type = ITEM_TYPES[record['kind']]
+    item = object.__new__(item_type)
+    for f in fields(item_type):
+        setattr(item, f.name, record.get(f.name, f.default))
+    item.platform = const.PLATFORMS[record['platform']].with_flag(record.get('platform_flag', PlatformFlag.DEF_ROM))
+    return item
+
+
+@dataclass(frozen=True)
+class FolderRules:
+    """
+    How the ROM folders of a platform are indexed, one directory listing at a time
+    (shared by the indexers below and the IndexCache, which re-lists only changed directories)
+
+    items(directory, entries): the items found in one listing
+    max_depth: deepest directory to list, the ROM folder itself being 1 (None: unlimited)
+    prune: lowercase names of directories to skip
+    databases: names of the const.DATABASES the items are read from
+    """
+    items: Callable[[str, list[os.DirEntry]], list[Item]]
+    max_depth: int = None
+    prune: frozenset[str] = frozenset()
+    databases: tuple[str, ...] = ()
+
+    def index(self, path: str) -> list[Item]:
+        """Walks a ROM folder and returns the items of every listing"""
+        return [item for directory, _, _, entries in walk_listings(path, self.max_depth, self.prune)
+                for item in self.items(directory, entries)]
+
+
+def _files(directory: str, entries: list[os.DirEntry], extensions: list[str]) -> list[str]:
+    """Returns abspath to the files in a listing matching any extension (case-insensitive)"""
+    extensions = {extension.lower() for extension in extensions}
+    return [f'{directory}\\{entry.name}' for entry in entries
+            if os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file()]
+
+
+def _generic_items(platform: Platform) -> Callable[[str, list[os.DirEntry]], list[Item]]:
+    return lambda directory, entries: [Item(source=file, platform=platform)
+                                       for file in _files(directory, entries, platform.extensions)]
+
+
+def _ps3_items(directory: str, entries: list[os.DirEntry]) -> list[PS3Item]:
+    """PS3 game ids are always 9ch in length"""
+    return [PS3Item(f'{directory}\\{entry.name}') for entry in entries if len(entry.name) == 9 and entry.is_dir()]
+
+
+def _switch_items(directory: str, entries: list[os.DirEntry]) -> list[Item]:
+    """Blacklists items if they're indexed as DLC or Updates"""
+    roms = _generic_items(const.PLATFORMS['switch'])(directory, entries)
+    # TODO: Find a better way to handle dlc/update checks
+    [rom.blacklist() for rom in roms if 'dlc' in rom.source.lower() or 'update' in rom.source.lower()]
+    return roms
+
+
+def _wiiu_items(directory: str, entries: list[os.DirEntry]) -> list[WiiUItem]:
+    return [WiiUItem(source=file, platform=const.PLATFORMS['wiiu'])
+            for file in _files(directory, entries, const.PLATFORMS['wiiu'].extensions)]
+
+
+def folder_rules(platform: Platform) -> FolderRules:
+    """Returns the FolderRules of a platform, generic (every matching file, recursively) unless specified"""
+    if platform.id == 'ps3':
+        # The ROM folder and its children (2 layers of directories)
+        return FolderRules(_ps3_items, max_depth=2, databases=('gameslist_ps3',))
+    if platform.id == 'wiiu':
+        # The ROM folder and 3 layers of directories below it
+        return FolderRules(_wiiu_items, max_depth=4, prune=frozenset({'content', 'meta'}))
+    if platform.id == 'switch':
+        return FolderRules(_switch_items)
+    return FolderRules(_generic_items(platform))
+
+
+@timed('index_generic_folder')
 def index_generic_folder(path: str, platform: Platform) -> list[Item]:
-    return [Item(source=file, platform=platform)
-            for file in scan_for_files(path, extensions=platform.extensions)]
+    return FolderRules(_generic_items(platform)).index(path)
 
 
+@timed('index_ps3_folder')
 def index_ps3_folder(path: str, children: int = 2) -> list[PS3Item]:
     """
     Takes a path to a folder containing PS3 ROM directories (including 2 children)
     returns a list of PS3Rom objects
-
-    PS3 game ids are always 9ch in length
     """
-    return [PS3Item(f"{directory}")
-            for directory in list_subfolders(path, children=children)
-            if len(os.path.basename(directory)) == 9]
+    return FolderRules(_ps3_items, max_depth=children).index(path)
 
 
+@timed('index_switch_folder')
 def index_switch_folder(path: str) -> list[Item]:
     """
     Take a path to a folder containing switch games for any valid ROM
@@ -240,13 +314,10 @@ def index_switch_folder(path: str) -> list[Item]:
 
     returns a list of IndexerItems
     """
-    roms = [Item(source=rom, platform=const.PLATFORMS['switch'])
-            for rom in scan_for_files(path, extensions=const.PLATFORMS['switch'].extensions)]
-    # TODO: Find a better way to handle dlc/update checks
-    [rom.blacklist() for rom in roms if 'dlc' in rom.source.lower() or 'update' in rom.source.lower()]
-    return roms
+    return folder_rules(const.PLATFORMS['switch']).index(path)
 
 
+@timed('index_wiiu_folder')
 def index_wiiu_folder(path: str) -> list[WiiUItem]:
     """
     Takes a Wii U ROM directory and returns a list of
@@ -254,17 +325,10 @@ def index_wiiu_folder(path: str) -> list[WiiUItem]:
 
     Entries in 'update' or 'dlc' folders are blacklisted by the subclass
     """
-    output = list()
-    relevant_folders = [path] + [folder for folder in list_subfolders(path, children=3)
-                                 if 'content' not in folder.split(path)[1].split('\\')
-                                 and 'meta' not in folder.split(path)[1].split('\\')]
-
-    for folder in relevant_folders:
-        output += [WiiUItem(source=file, platform=const.PLATFORMS['wiiu'])
-                   for file in scan_for_files(folder, extensions=const.PLATFORMS['wiiu'].extensions, recursive=False)]
-    return output
+    return folder_rules(const.PLATFORMS['wiiu']).index(path)
 
 
+@timed('index_steam_library')
 def index_steam_library(primary_steam_dir: str) -> list[SteamItem]:
     """
     Takes the primary steam directory (C:\\Program Files (x86)\\Steam)
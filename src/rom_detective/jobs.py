@@ -0,0 +1,155 @@
+__all__ = ['Job', 'JobCancelled', 'Progress', 'index_job', 'shortcuts_job']
+
+import threading
+from dataclasses import dataclass, field
+from typing import Callable
+
+from rom_detective.query import STATUSES, game_statuses
+
+
+"""
+Jobs
+====
+Long running RomDetective tasks (indexing, creating shortcuts) in a background thread,
+streaming their partial results back through callbacks:
+    on_progress(Progress): after every indexed folder / every written shortcut
+    on_done(result): once the task finished
+    on_error(exception): if the task raised (JobCancelled if it was cancelled)
+
+Callbacks are called from the worker thread, a GUI should forward them to its own thread (Qt: signals).
+Job.run() runs the task in the calling thread, so any thread pool can run it (QThreadPool.start(job.run)),
+Job.start() runs it in a new thread.
+
+Only one job should touch a RomDetective at a time.
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+@dataclass
+class Progress:
+    phase: str  # 'index' or 'shortcuts'
+    done: int  # folders indexed / log entries done
+    total: int = None  # folders to index, None if unknown
+    path: str = None  # the folder that was just indexed
+    items: list = field(default_factory=list)  # partial results: the items of that folder / the log entry
+    counts: dict[str, int] = field(default_factory=dict)  # running totals
+
+
+class Job:
+    """Job Class"""
+    def __init__(self, task: Callable[['Job'], any], on_progress: Callable[[Progress], None] = None,
+                 on_done: Callable[[any], None] = None, on_error: Callable[[Exception], None] = None):
+        """task(job) does the work, reporting its progress through job.report(Progress)"""
+        self.task = task
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.result = None
+        self.error = None
+        self._started = threading.Event()
+        self._finished = threading.Event()
+        self._cancelled = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._started.is_set() and not self._finished.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished.is_set()
+
+    def check_cancelled(self) -> None:
+        """Called by the task, raises JobCancelled once the job is cancelled"""
+        if self._cancelled.is_set():
+            raise JobCancelled('Cancelled')
+
+    def report(self, progress: Progress) -> None:
+        """Called by the task, raises JobCancelled once the job is cancelled"""
+        self.check_cancelled()
+        if self.on_progress:
+            self.on_progress(progress)
+
+    def cancel(self) -> None:
+        """
+        Stops the task at its next progress report,
+        shortcuts already queued are dropped, only the ones being written finish
+        """
+        self._cancelled.set()
+
+    def run(self) -> None:
+        """Runs the task in the calling thread"""
+        self._started.set()
+        try:
+            self.result = self.task(self)
+        except Exception as e:
+            self.error = e
+            if self.on_error:
+                self.on_error(e)
+        else:
+            if self.on_done:
+                self.on_done(self.result)
+        finally:
+            self._finished.set()
+
+    def start(self) -> 'Job':
+        """Runs the task in a new (daemon) thread"""
+        self._started.set()
+        threading.Thread(target=self.run, daemon=True).start()
+        return self
+
+    def wait(self, timeout: float = None) -> any:
+        """Waits for the task to finish, returns its result (or raises its error)"""
+        if not self._finished.wait(timeout):
+            raise TimeoutError('Job did not finish in time')
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def _index(rd, job: Job, parallel: bool = True) -> list:
+    """Indexes everything (rd.index_all), reporting every indexed folder with the running totals"""
+    total = len([path for path, platform in rd.platforms.items() if platform])
+    counts = dict.fromkeys(['games', *STATUSES], 0)
+
+    def progress(path: str, items: list) -> None:
+        counts['games'] += len(items)
+        for item in items:
+            for status in game_statuses(item):
+                counts[status] += 1
+        job.report(Progress('index', len(done) + 1, total, path, items, dict(counts)))
+        done.append(path)
+
+    done = list()
+    rd.index_all(parallel=parallel, progress=progress)
+    return rd.games
+
+
+def index_job(rd, parallel: bool = True, **callbacks) -> Job:
+    """Job indexing everything (if not indexed yet, otherwise re-applying the lists), returns rd.games"""
+    def task(job: Job) -> list:
+        if not rd.is_indexed:
+            return _index(rd, job, parallel=parallel)
+        if rd.refresh_lists():
+            print('Info: Blacklist or whitelist changed, updated indexed games')
+        return rd.games
+    return Job(task, **callbacks)
+
+
+def shortcuts_job(rd, dry_run: bool = False, sync: bool = True, workers: int = 8, **callbacks) -> Job:
+    """Job creating (syncing) the shortcuts of rd, indexing first if needed"""
+    def task(job: Job) -> None:
+        if not rd.is_indexed:
+            _index(rd, job)
+        job.check_cancelled()
+        counts = dict()
+
+        def progress(entry: dict) -> None:
+            kind = next(iter(entry))
+            counts[kind] = counts.get(kind, 0) + 1
+            job.report(Progress('shortcuts', sum(counts.values()), items=[entry], counts=dict(counts)))
+
+        rd.create_shortcuts(dry_run=dry_run, workers=workers, sync=sync, progress=progress)
+    return Job(task, **callbacks)
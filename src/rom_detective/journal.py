@@ -0,0 +1,109 @@
+__all__ = ['Journal']
+
+import os
+import threading
+
+from rom_detective import LOGS_FOLDER
+from rom_detective.logger import Logger, LoggerFlag
+
+
+"""
+Journal
+=======
+An append-only journal of the shortcuts created (and removed) during a run, written as the run goes,
+so an interrupted run can be resumed without writing every shortcut again
+
+Every line is one of:
+    +{shortcut}->{source}: the shortcut was created
+    -{shortcut}->{source}: the shortcut was removed
+
+The journal is flushed to disk every <checkpoint> lines and deleted once a run completes (finish),
+a journal that is still around at the start of a run means the previous run was interrupted
+"""
+
+
+class Journal:
+    """Journal Class"""
+    def __init__(self, path_dir: str = LOGS_FOLDER, checkpoint: int = 500):
+        self.path = f'{path_dir}\\journal.log'
+        self.path_dir = path_dir
+        self.checkpoint = checkpoint
+        self._file = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def interrupted(self) -> bool:
+        """True if a previous run left its journal behind"""
+        return os.path.isfile(self.path)
+
+    def apply(self, shortcuts: dict[str, str]) -> dict[str, str]:
+        """Returns a copy of {shortcut: source} (see Logger.load) with the journaled changes applied"""
+        shortcuts = dict(shortcuts)
+        try:
+            lines = open(self.path, 'r', encoding='utf-8').read().split('\n')
+        except FileNotFoundError:
+            return shortcuts
+        for line in lines:
+            shortcut, _, source = line[1:].partition('->')
+            if not source:
+                continue  # Incomplete line, cut off by the interruption
+            if line.startswith('+'):
+                shortcuts[shortcut] = source
+            elif line.startswith('-'):
+                shortcuts.pop(shortcut, None)
+        return shortcuts
+
+    def reconstruct(self) -> dict[str, str]:
+        """
+        Rewrites active_shortcuts.log from the previous log and the journal of an interrupted run
+
+        Returns the resulting {shortcut: source}
+        """
+        logger = Logger()
+        shortcuts = self.apply(logger.load(self.path_dir))
+        with open(f'{self.path_dir}\\{logger.log_files[LoggerFlag.SUCCESS]}', 'w', encoding='utf-8') as file:
+            file.writelines(f'{shortcut}->{source}\n' for shortcut, source in shortcuts.items())
+        return shortcuts
+
+    def open(self) -> 'Journal':
+        os.makedirs(self.path_dir, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        return self
+
+    def record(self, entry: dict) -> None:
+        """Journals a create_shortcut result ({success: ...} or {removed: ...}), other entries are ignored"""
+        flag, line = next(iter(entry.items()))
+        prefix = {LoggerFlag.SUCCESS: '+', LoggerFlag.REMOVED: '-'}.get(flag)
+        if not prefix:
+            return
+        with self._lock:
+            self._file.write(f'{prefix}{line}\n')
+            self._pending += 1
+            if self._pending >= self.checkpoint:
+                self._flush()
+
+    def _flush(self) -> None:
+        """Checkpoint, everything journaled so far is on disk"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self) -> None:
+        if self._file:
+            with self._lock:
+                self._flush()
+                self._file.close()
+                self._file = None
+
+    def finish(self) -> None:
+        """Closes and deletes the journal, call once the run completed and its logs are written"""
+        self.close()
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def __enter__(self) -> 'Journal':
+        return self.open()
+
+    def __exit__(self, *_) -> None:
+        self.close()
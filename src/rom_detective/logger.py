@@ -1,5 +1,10 @@
+import json
+import shutil
+import tempfile
+from datetime import datetime
 from pathlib import Path
 from dataclasses import dataclass
+from typing import IO
 
 
 @dataclass
@@ -8,64 +13,133 @@ class LoggerFlag:
     BLACKLIST = 'blacklist'
     DRY_RUN = 'dry_run'
     PLATFORMS = 'platforms'
+    REMOVED = 'removed'
+    SKIPPED = 'skipped'
 
 
 """
 Logger
 ======
 A logger for Rom Detective
-Holds logs in a dict with 4 key values:
+Counts entries per kind, entries are taken as a dict of {<kind>: string} (+ optionally 'platform': <platform id>)
 
 From create_shortcut:
-    'blacklist': list() -> list of items that have not been processed blacklisted ({source})
-    'success' or 'dry_run': list() -> list of items that were successful ({shortcut}->{source})
+    'blacklist': items that have not been processed blacklisted ({source} [{filename}])
+    'success' or 'dry_run': items that were successful ({shortcut}->{source})
 
 From platforms:
-    'platforms': list() -> list of ({platform_source}->{platform_name})
+    'platforms': ({platform_source}->{platform_name})
+
+From sync_shortcuts:
+    'removed': shortcuts deleted since the previous run ({shortcut}->{source})
+    'skipped': shortcuts kept because their folder was not indexed (unreachable), still active ({shortcut}->{source})
+
+Entries are not kept in memory, they are streamed into (buffered) temporary files as they are added:
+    blacklist.log and active_shortcuts.log: the plain lines, copied into place by write()
+    log.jsonl: one JSON record per entry (kind, source, destination, platform, timestamp),
+               appended to the log folder by write(), or as entries are added once open() is called.
+               Entries marked {'changed': False} (unchanged since the previous sync) get no record
 """
 
 
+def to_record(kind: str, line: str, platform: str = '') -> dict:
+    """Turns a log entry into a structured record"""
+    if kind == LoggerFlag.BLACKLIST:
+        source, destination = line.rsplit(' [', 1)[0], ''
+    else:
+        destination, _, source = line.partition('->')
+    return {'kind': kind,
+            'source': source,
+            'destination': destination,
+            'platform': platform,
+            'timestamp': datetime.now().isoformat(timespec='seconds')}
+
+
 class Logger:
     """Logger Class"""
     def __init__(self):
-        self.log = dict({
-            LoggerFlag.BLACKLIST: list(),
-            LoggerFlag.SUCCESS: list(),
-            LoggerFlag.DRY_RUN: list(),
-            LoggerFlag.PLATFORMS: list(),
-        })
+        self.counts = {flag: 0 for flag in [LoggerFlag.BLACKLIST, LoggerFlag.SUCCESS, LoggerFlag.DRY_RUN,
+                                            LoggerFlag.PLATFORMS, LoggerFlag.REMOVED, LoggerFlag.SKIPPED]}
         self.log_files: dict = dict({
             LoggerFlag.BLACKLIST: 'blacklist.log',
             LoggerFlag.SUCCESS: 'active_shortcuts.log',
         })
+        self.records_file = 'log.jsonl'
+        self._spools: dict[str, IO] = dict()
+        self._records: IO = None
+        self._records_streamed = False
+
+    def _spool(self, kind: str) -> IO:
+        if kind not in self._spools:
+            self._spools[kind] = tempfile.TemporaryFile('w+', encoding='utf-8')
+        return self._spools[kind]
+
+    def open(self, path_dir: str) -> None:
+        """Append the structured records to <path_dir>\\log.jsonl as they are added, instead of on write()"""
+        Path(path_dir).mkdir(parents=True, exist_ok=True)
+        self._records = open(f'{path_dir}\\{self.records_file}', 'a', encoding='utf-8')
+        self._records_streamed = True
 
     def add(self, entry: dict) -> None:
         """Add an entry to the log, takes a dict of {<log_type>: string}"""
-        self.log[list(entry.keys())[0]] += entry.values()
+        kind, line = next(iter(entry.items()))
+        self.counts[kind] += 1
+        if kind in self.log_files:
+            self._spool(kind).write(f'{line}\n')
+        elif kind == LoggerFlag.SKIPPED:  # Still active
+            self._spool(LoggerFlag.SUCCESS).write(f'{line}\n')
+        if not entry.get('changed', True):
+            return
+        if not self._records:
+            self._records = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._records.write(json.dumps(to_record(kind, line, entry.get('platform', ''))) + '\n')
 
     @property
     def successful(self) -> int:
         """Returns amount of lines in success or dry_run"""
-        return len(self.log[LoggerFlag.SUCCESS]) + len(self.log[LoggerFlag.DRY_RUN])
+        return self.counts[LoggerFlag.SUCCESS] + self.counts[LoggerFlag.DRY_RUN]
 
     @property
     def blacklisted(self) -> int:
         """Returns amount of blacklisted items"""
-        return len(self.log[LoggerFlag.BLACKLIST])
+        return self.counts[LoggerFlag.BLACKLIST]
 
     @property
     def platforms(self) -> int:
         """Returns amount of platforms"""
-        return len(self.log[LoggerFlag.PLATFORMS])
+        return self.counts[LoggerFlag.PLATFORMS]
+
+    @property
+    def removed(self) -> int:
+        """Returns amount of removed shortcuts"""
+        return self.counts[LoggerFlag.REMOVED]
+
+    @property
+    def skipped(self) -> int:
+        """Returns amount of shortcuts kept because their folder was not indexed"""
+        return self.counts[LoggerFlag.SKIPPED]
 
     @property
     def total(self) -> int:
         """Returns sum of all entries, excluding platforms"""
-        return sum([len(self.log[key]) for key in [LoggerFlag.BLACKLIST, LoggerFlag.SUCCESS, LoggerFlag.DRY_RUN]])
+        return sum([self.counts[key] for key in [LoggerFlag.BLACKLIST, LoggerFlag.SUCCESS, LoggerFlag.DRY_RUN]])
+
+    def load(self, path_dir: str) -> dict[str, str]:
+        """
+        Load the active_shortcuts.log of a previous run from the given path, used to compare against
 
-    def load(self, path: str) -> None:
-        """Load a series of old log files, will be used to compare"""
-        raise NotImplementedError
+        Returns a dict of {shortcut: source}, empty if there is no previous log
+        If a shortcut is listed more than once, the first source is kept (the one that got created)
+        """
+        shortcuts = dict()
+        try:
+            file = open(f'{path_dir}\\{self.log_files[LoggerFlag.SUCCESS]}', 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return shortcuts
+        with file:
+            [shortcuts.setdefault(shortcut, source.rstrip('\n'))
+             for shortcut, _, source in (line.partition('->') for line in file) if source.strip()]
+        return shortcuts
 
     def write(self, path_dir: str) -> bool:
         """
@@ -73,7 +147,7 @@ class Logger:
 
         Returns True if log is written, False if it is skipped
         """
-        if len(self.log[LoggerFlag.DRY_RUN]):
+        if self.counts[LoggerFlag.DRY_RUN]:
             print(f"Would've written {self.successful} entries to active_shortcuts.log\n"
                   f"and {self.blacklisted} entries to blacklist.log (DRY_RUN)")
             return False
@@ -86,15 +160,29 @@ class Logger:
             raise RuntimeError(f'Invalid directory: {Path(path_dir).parent}')
 
         for key, logfile in self.log_files.items():
-            target = f'{path_dir}\\{logfile}'
-            if key in self.log.keys():
-                file = open(target, "w+", encoding='utf-8')
-                file.write('\n'.join(self.log[key]))
-                file.close()
+            with open(f'{path_dir}\\{logfile}', 'w+', encoding='utf-8') as file:
+                if key in self._spools:
+                    self._spools[key].seek(0)
+                    shutil.copyfileobj(self._spools[key], file)
+
+        if self._records and self._records_streamed:
+            self._records.flush()
+        elif self._records:
+            self._records.seek(0)
+            with open(f'{path_dir}\\{self.records_file}', 'a', encoding='utf-8') as file:
+                shutil.copyfileobj(self._records, file)
+            self._records.close()
+            self._records = None
 
         return True
 
+    def close(self) -> None:
+        [spool.close() for spool in self._spools.values()]
+        if self._records:
+            self._records.close()
+
     def reset(self):
+        self.close()
         self.__init__()
 
     def __str__(self):
@@ -105,5 +193,7 @@ class Logger:
                f"================================================================\n" \
                f"Blacklisted games: {self.blacklisted}, see logs/blacklist.log for details\n" \
                f"Successful games: {self.successful}, see logs/active_shortcuts.log for details\n" \
+               f"Removed shortcuts: {self.removed}\n" \
+               + (f"Kept shortcuts of unreachable folders: {self.skipped}\n" if self.skipped else "") + \
                f"Sum of indexed games: {self.total} over {self.platforms} platforms.\n" \
                f"================================================================\n"
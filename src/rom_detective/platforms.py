@@ -1,5 +1,8 @@
-import yaml
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from collections.abc import Iterable, Mapping
+from functools import lru_cache
+
+from rom_detective.compiled import load_compiled
 
 
 @dataclass
@@ -8,66 +11,116 @@ class PlatformFlag:
     STEAM = 'steam'
 
 
-@dataclass
+@dataclass(frozen=True, eq=False)
 class Platform:
     """
     id: 'n64', 'win'
     name: 'Nintendo 64', 'Windows'
-    aliases: ['nintendo64', +'nintendo 64', +'n64'],
-             ['win10','win11','windows10','windows11', +'windows', +'win']
+    aliases: ('nintendo64', +'nintendo 64', +'n64'),
+             ('win10','win11','windows10','windows11', +'windows', +'win')
     flag: PlatformFlag.DEFAULT (Used to differentiate special platforms that require special methods)
+
+    Platforms are immutable and compared by identity (hashable),
+    use intern_platform() to get the shared instance of a platform
     """
     id: str
     name: str
-    aliases: list[str]
-    extensions: list[str]
-    flag = PlatformFlag.DEF_ROM
+    aliases: tuple[str, ...]
+    extensions: tuple[str, ...]
+    flag: str = PlatformFlag.DEF_ROM
 
     def __str__(self) -> str:
-        return f'Platform: {self.name} ({self.id}). Aliases={self.aliases}'
+        return f'Platform: {self.name} ({self.id}). Aliases={list(self.aliases)}'
 
     def __post_init__(self) -> None:
         """Add name and id to aliases"""
-        self.aliases += [self.name.lower()]
-        self.aliases += [self.id.lower()]
         # Remove duplicate entries from aliases
-        self.aliases = list(dict.fromkeys(self.aliases))
+        aliases = list(dict.fromkeys([*self.aliases, self.name.lower(), self.id.lower()]))
+        object.__setattr__(self, 'aliases', tuple(aliases))
+        object.__setattr__(self, 'extensions', tuple(self.extensions))
 
     def matches_alias(self, alias) -> bool:
         """Boolean check if an alias matches that of the platform aliases"""
         return True if alias.lower() in self.aliases else False
 
+    def with_flag(self, flag: str) -> 'Platform':
+        """Returns the (interned) variant of this platform with another flag, e.g. Windows for Steam"""
+        return self if flag == self.flag else intern_platform(replace(self, flag=flag))
 
-def import_platforms(yaml_file: str) -> list[Platform]:
+
+_INTERNED: dict[tuple, Platform] = dict()
+
+
+def intern_platform(platform: Platform) -> Platform:
+    """Returns the shared instance of a platform, equal platforms (all fields) are only kept once"""
+    key = (platform.id, platform.name, platform.aliases, platform.extensions, platform.flag)
+    return _INTERNED.setdefault(key, platform)
+
+
+def _read_yaml(yaml_file: str) -> dict:
+    # Imported on first use, as PyYAML is slow to import and only needed when platforms.yaml changed
+    import yaml
     with open(yaml_file) as file:
-        return [Platform(id=v['id'],
-                         name=k,
-                         aliases=v['aliases'],
-                         extensions=v['extensions'])
-                for k, v in yaml.full_load(file).items()]
+        return yaml.full_load(file)
+
+
+def import_platforms(yaml_file: str) -> list[Platform]:
+    """Reads a platforms.yaml file (or its compiled copy, if unchanged), returns a list of Platforms"""
+    return [intern_platform(Platform(id=v['id'],
+                                     name=k,
+                                     aliases=v['aliases'],
+                                     extensions=v['extensions']))
+            for k, v in load_compiled(yaml_file, _read_yaml).items()]
+
+
+class AliasIndex:
+    """
+    Maps every (lowercase) alias to a single Platform, built once per collection of platforms
+
+    If an alias is shared by several platforms, the first platform keeps it and a warning is printed
+    Lookups of a path are memoized
+    """
+    def __init__(self, platforms: list[Platform]):
+        self.platforms = list(platforms)
+        self.aliases: dict[str, Platform] = dict()
+        for platform in self.platforms:
+            for alias in platform.aliases:
+                owner = self.aliases.setdefault(alias.lower(), platform)
+                if owner is not platform:
+                    print(f'Warning: The alias "{alias}" of {platform.id} is already used by {owner.id}, ignoring it')
+        self.lookup = lru_cache(maxsize=4096)(self._lookup)
+
+    def _lookup(self, path_or_alias: str) -> Platform:
+        """Returns the platform of the deepest folder matching an alias, or None"""
+        for folder in reversed(path_or_alias.lower().split('\\')):
+            if folder in self.aliases:
+                return self.aliases[folder]
+        return None
 
 
-def identify_platform(path_or_alias: str, platforms: list[Platform]) -> Platform:
+def identify_platform(path_or_alias: str, platforms: AliasIndex | Iterable[Platform]) -> Platform:
     """
-    Takes a str of a path or alias and a list of Platforms to a ROM
+    Takes a str of a path or alias and an AliasIndex (or a list of Platforms) to a ROM
 
     Returns a corresponding platform if a parent folder matches one of the platform aliases.
+    Pass an AliasIndex that is built once (const.alias_index()) when identifying several paths,
+    a list of Platforms gets indexed on every call
 
     Raises a warning if no platform is identified
     """
-    for folder in reversed(path_or_alias.lower().split('\\')):
-        output = [x for x in platforms if x.matches_alias(folder)]
-        if output:
-            return output[0]
+    index = platforms if isinstance(platforms, AliasIndex) else AliasIndex(platforms)
+    platform = index.lookup(path_or_alias)
+    if platform:
+        return platform
     raise Warning(f"Warning: Could not find a platform for {path_or_alias}")
 
 
-def identify_platform_from_path(path: str, platforms: dict[str: list[Platform]]) -> Platform:
+def identify_platform_from_path(path: str, platforms: AliasIndex | Mapping[str, Platform]) -> Platform:
     """
     Returns a single platform if a folder name in the given path
     matches any of the alias entries in 'data/platforms.yaml'
     """
     try:
-        return identify_platform(path, platforms.values())
+        return identify_platform(path, platforms if isinstance(platforms, AliasIndex) else platforms.values())
     except Warning as e:
         print(e)
@@ -0,0 +1,83 @@
+__all__ = ['GameIndex', 'game_statuses']
+
+from typing import Iterable
+
+from rom_detective.item import Item
+from rom_detective.platforms import Platform
+
+
+"""
+GameIndex
+=========
+Secondary indexes over the indexed games, kept per source root (the paths of RomDetective.platforms)
+
+Every root holds a bucket of items per (platform, status), status being an RDFlag value:
+    'whitelisted': whitelisted items
+    'blacklisted': blacklisted items that are not whitelisted
+    'indexed': items that are not blacklisted, or whitelisted
+
+Counts are the sum of the matching bucket sizes, and listing the games of one root only touches that root.
+Buckets are rebuilt per root, whenever a root is (re-)indexed or the lists are re-applied.
+"""
+
+STATUSES = ('whitelisted', 'blacklisted', 'indexed')
+
+
+def game_statuses(item: Item) -> tuple[str, ...]:
+    """Returns the statuses (RDFlag values) an item is listed under"""
+    if item.whitelisted:
+        return 'whitelisted', 'indexed'
+    return ('blacklisted',) if item.blacklisted else ('indexed',)
+
+
+class GameIndex:
+    """GameIndex Class"""
+    def __init__(self):
+        self._roots: dict[str, dict[tuple[Platform, str], list[Item]]] = dict()
+        self._items: dict[str, list[Item]] = dict()
+
+    def add_root(self, root: str, items: list[Item]) -> None:
+        """(Re)builds the buckets of a root from its items"""
+        buckets = dict()
+        for item in items:
+            for status in game_statuses(item):
+                buckets.setdefault((item.platform, status), []).append(item)
+        self._roots[root] = buckets
+        self._items[root] = items
+
+    def drop_root(self, root: str) -> None:
+        self._roots.pop(root, None)
+        self._items.pop(root, None)
+
+    def clear(self) -> None:
+        self._roots = dict()
+        self._items = dict()
+
+    def __contains__(self, root: str) -> bool:
+        return root in self._roots
+
+    def _buckets(self, status: str = None, platform: Platform = None,
+                 roots: Iterable[str] = None) -> Iterable[list[Item]]:
+        """Yields the lists of items matching a status, platform and/or roots"""
+        for root in self._roots if roots is None else roots:
+            if root not in self._roots:
+                continue
+            if status is None:
+                items = self._items[root]
+                yield items if platform is None else [item for item in items if item.platform is platform]
+                continue
+            for (bucket_platform, bucket_status), items in self._roots[root].items():
+                if bucket_status == status and (platform is None or bucket_platform is platform):
+                    yield items
+
+    def count(self, status: str = None, platform: Platform = None, roots: Iterable[str] = None) -> int:
+        """Counts the games matching a status (RDFlag value), platform and/or roots, without listing them"""
+        if status is None and platform is not None:
+            # Every item is in exactly one of these buckets (whitelisted items are indexed as well)
+            roots = None if roots is None else list(roots)
+            return sum(self.count(status, platform, roots) for status in ('blacklisted', 'indexed'))
+        return sum(len(items) for items in self._buckets(status, platform, roots))
+
+    def query(self, status: str = None, platform: Platform = None, roots: Iterable[str] = None) -> list[Item]:
+        """Lists the games matching a status (RDFlag value), platform and/or roots, in the order of the roots"""
+        return [item for items in self._buckets(status, platform, roots) for item in items]
@@ -1,15 +1,25 @@
+import os
+import time
+from contextlib import closing, nullcontext
 from dataclasses import dataclass, field
+from typing import Callable
 from pathlib import Path
 
 from rom_detective import ROOT_FOLDER, CONF_FOLDER, DEFAULT_TARGET_FOLDER, LOGS_FOLDER
-from rom_detective.const import PLATFORMS
+from rom_detective.const import PLATFORMS, alias_index
 
+from rom_detective.cache import IndexCache
+from rom_detective.history import RunHistory
+from rom_detective.instrumentation import INSTRUMENTS, Instruments, timed
+from rom_detective.journal import Journal
 from rom_detective.logger import Logger, LoggerFlag
+from rom_detective.rules import RULES
 from rom_detective.item import Item, index_pairs, index_steam_library
-from rom_detective.util import identify_platforms_from_path
+from rom_detective.util import identify_platforms_from_path, run_per_device
 from rom_detective.platforms import Platform, PlatformFlag, identify_platform_from_path
+from rom_detective.query import GameIndex
 
-from rom_detective.shortcuts import create_shortcut
+from rom_detective.shortcuts import diff_shortcuts, iter_create_shortcuts, iter_sync_shortcuts
 
 
 @dataclass
@@ -28,13 +38,21 @@ Work in progress
 
 @dataclass
 class RomDetective:
-    logger: Logger = field(init=False, default=Logger())
+    logger: Logger = field(init=False, default_factory=Logger)
     target_folder: str = field(init=False, default=DEFAULT_TARGET_FOLDER)
+    logs_folder: str = field(init=False, default=LOGS_FOLDER)  # logs, journal and (by default) the run history
     platforms: dict[str, Platform] = field(init=False, default_factory=dict)
     games: list[Item] = field(init=False, default_factory=list)
     stats: dict[str, list] = field(init=False, default_factory=dict)
     is_indexed: bool = field(init=False, default=False)
+    index_cache: IndexCache = field(init=False, default=None)
+    history: RunHistory = field(init=False, default=None)
     _steam_folder: str = field(init=False, default_factory=str)
+    _games_by_root: dict[str, list[Item]] = field(init=False, repr=False, default_factory=dict)
+    game_index: GameIndex = field(init=False, repr=False, default_factory=GameIndex)
+    _unreachable: set[str] = field(init=False, repr=False, default_factory=set)
+    _removed_roots: set[str] = field(init=False, repr=False, default_factory=set)
+    _touched: dict[str, set[str]] = field(init=False, repr=False, default_factory=dict)
 
     def _load_platform(self, path: str, platform: Platform, flag: str):
         if flag == PlatformFlag.STEAM:
@@ -95,53 +113,152 @@ class RomDetective:
         self.platforms = dict()
         self._platform_changes_made()
 
-    def _platform_changes_made(self) -> None:
-        """Called when changes are made"""
-        if self.is_indexed:
+    def _platform_changes_made(self, paths: list[str] = None) -> None:
+        """
+        Called when changes are made
+
+        If the given paths are indexed, only their items are dropped and re-indexed,
+        without specifying any paths everything is flushed (forcing a full re-index)
+        """
+        if paths is None and self.is_indexed:
             self.is_indexed = False
             self._reset_games()
-            # TODO: Delete associated items from self.games, without forced re-index of everything
-            # self.index_all()
+        elif paths is not None and self.is_indexed:
+            for path in paths:
+                self._drop_root(path)
+                if self.platforms.get(path):
+                    self.index_platform_from_path(path, update_stats=False)
+            self._combine_games()
         if self.stats:
-            self.update_stats()
+            self.update_stats(paths)
 
     def _reset_games(self):
         """Flushes self.games"""
         del self.games
         self.games = list()
+        self._games_by_root = dict()
+        self.game_index.clear()
 
-    # TODO: Maybe make this be a button?
-    def index_platform_from_path(self, path: str, update_stats=True) -> list[Item]:
-        """Index ROMs/Games from a specific platform"""
-        if not self.platforms[path]:
-            print(f'{path} is not tied to any platform, skipping')
+    def _drop_root(self, path: str) -> None:
+        """Forget the items indexed from a path"""
+        self._games_by_root.pop(path, None)
+        self.game_index.drop_root(path)
+
+    def _indexed_source(self, source: str) -> bool:
+        """
+        True if the source of a shortcut was indexed this run (it is inside a reachable indexed folder),
+        or the folder it was in got removed
+        """
+        if source.startswith('URL=steam://'):
+            if not self.steam_folder:
+                return '' in self._removed_roots  # The Steam folder got removed
+            roots = [self.steam_folder]
+        else:
+            roots = [path for path in [*self._games_by_root, *self._removed_roots]
+                     if source.lower().startswith(f'{path.lower()}\\')]
+        return any(root in self._removed_roots or (root in self._games_by_root and root not in self._unreachable)
+                   for root in roots)
+
+    def _combine_games(self) -> list[Item]:
+        """Rebuilds self.games from the items of every root, in the order of self.platforms"""
+        self.games = [game for path in self.platforms for game in self._games_by_root.get(path, [])]
+        return self.games
+
+    def enable_index_cache(self, path: str = f'{CONF_FOLDER}\\index.db') -> IndexCache:
+        """Keep an on-disk index of scanned ROM folders, unchanged folders are loaded from it on re-index"""
+        self.index_cache = IndexCache(path)
+        return self.index_cache
+
+    def enable_history(self, path_dir: str = None) -> RunHistory:
+        """Append the metrics of every run to <path_dir (default: logs_folder)>\\history.jsonl"""
+        self.history = RunHistory(path_dir or self.logs_folder)
+        return self.history
+
+    def _record_run(self, kind: str, phase: str, start: float, items: int,
+                    instrumented: dict, counts: dict) -> None:
+        """Appends a run to the history (if enabled), with the phases instrumented since the run started"""
+        if not self.history:
+            return
+        phases = {phase: {'calls': 1, 'seconds': time.perf_counter() - start, 'items': items}}
+        phases.update(INSTRUMENTS.since(instrumented) if INSTRUMENTS.enabled else dict())
+        self.history.append(kind, phases, counts)
+
+    def enable_instrumentation(self, memory: bool = False) -> Instruments:
+        """
+        Time (and count) every phase of a run, printed alongside the log summary of create_shortcuts
+        Optional flag: memory: bool (default: False) also trace the peak memory of every phase (slower)
+        """
+        return INSTRUMENTS.enable(memory=memory)
+
+    def _index_rom_folder(self, path: str) -> list[Item]:
+        """Index a default ROM folder, through the index cache if enabled"""
+        platform = self.platforms[path]
+        if not self.index_cache:
+            return index_pairs({path: platform})
+        return self.index_cache.index(path, platform, directories=self._touched.get(path))
+
+    def _index_path(self, path: str) -> list[Item]:
+        """Index ROMs/Games from a specific path, without storing them"""
+        if not os.path.isdir(path):
+            print(f'Warning: {path} is not reachable, its shortcuts are kept as they are')
+            self._unreachable.add(path)
+            return list()
+        self._unreachable.discard(path)
 
         # Default ROMs
         if self.platforms[path].flag == PlatformFlag.DEF_ROM:
-            self.games += index_pairs({path: self.platforms[path]})
+            return self._index_rom_folder(path)
 
         # Steam library
         elif self.platforms[path].flag == PlatformFlag.STEAM:
-            self.games += index_steam_library(self.steam_folder)
+            return index_steam_library(self.steam_folder)
 
         else:  # pragma: no cover
             raise RuntimeError(f"Couldn't index items ({path}: {self.platforms[path]}")
 
+    # TODO: Maybe make this be a button?
+    def index_platform_from_path(self, path: str, update_stats=True) -> list[Item]:
+        """Index ROMs/Games from a specific platform"""
+        if not self.platforms[path]:
+            print(f'{path} is not tied to any platform, skipping')
+            return self.games
+
+        self._games_by_root[path] = self._index_path(path)
+
         # Optional flag to not force an update (called manually by index_all)
         if update_stats:
-            self.update_stats()
+            self._combine_games()
+            self.update_stats([path])
 
         return self.games
 
-    def update_stats(self) -> dict:
-        """Deletes self.stats, then rebuilds it"""
+    @timed('update_stats')
+    def update_stats(self, paths: list[str] = None) -> dict:
+        """
+        Rebuilds the stats of the given paths (default: all paths),
+        then combines the stats of every path into self.stats
+        """
+        for path in self._games_by_root if paths is None else paths:
+            if path in self._games_by_root:
+                self.game_index.add_root(path, self._games_by_root[path])
+
         del self.stats
-        self.stats = dict()
-        self.stats[RDFlag.WHITELISTED] = [game for game in self.games if game.whitelisted]
-        self.stats[RDFlag.BLACKLISTED] = [game for game in self.games if game.blacklisted and not game.whitelisted]
-        self.stats[RDFlag.INDEXED] = [game for game in self.games if not game.blacklisted or game.whitelisted]
+        self.stats = {flag: self.query(flag) for flag in [RDFlag.WHITELISTED, RDFlag.BLACKLISTED, RDFlag.INDEXED]}
         return self.stats
 
+    def refresh_lists(self) -> bool:
+        """
+        Re-applies blacklist.cfg and whitelist.cfg to the indexed games if either changed,
+        then updates stats (no filesystem scan)
+
+        Returns True if the lists changed
+        """
+        if not RULES.refresh():
+            return False
+        [game.apply_rules() for game in self.games]
+        self.update_stats()
+        return True
+
     """
         End Internal methods
     ##########################################
@@ -159,22 +276,24 @@ class RomDetective:
 
         If none found - allow user to specify manually. User should also be able to override the platform
         """
-        platform = identify_platform_from_path(path, platforms=PLATFORMS) if not platform else platform
+        platform = identify_platform_from_path(path, platforms=alias_index()) if not platform else platform
         if platform:
             platforms = {path: platform}
         else:
             platforms = {path: platform} if platform else identify_platforms_from_path(path)
             platforms = platforms if platforms.values() else {path: None}
         self.platforms.update(platforms)
-        self._platform_changes_made()
+        self._removed_roots.difference_update(platforms)
+        self._platform_changes_made(list(platforms))
 
     def remove_folder(self, path: str) -> None:
         """
         Remove a folder (requires just the path),
         remove any associated platforms/indexed items
         """
-        self.platforms.pop(path, None)
-        self._platform_changes_made()
+        if self.platforms.pop(path, None):
+            self._removed_roots.add(path)
+        self._platform_changes_made([path])
 
     def add_steam_folder(self, path) -> None:
         """
@@ -185,12 +304,9 @@ class RomDetective:
         """
         self.remove_folder(self._steam_folder)
         self._steam_folder = path
-
-        # TODO: A neater way to do this
-        steam_platform = PLATFORMS.copy()['win']
-        steam_platform.flag = PlatformFlag.STEAM
-        # END_TODO
-        self.platforms.update({path: steam_platform})
+        self.platforms.update({path: PLATFORMS['win'].with_flag(PlatformFlag.STEAM)})
+        self._removed_roots.difference_update([path, ''])
+        self._platform_changes_made([path])
 
     def remove_steam_folder(self) -> None:
         """Deleter for steam_folder"""
@@ -198,32 +314,142 @@ class RomDetective:
         self._steam_folder = ''
         # Delete after to trigger self._platform_changes_made
         self.remove_folder(c)
+        if c:
+            self._removed_roots.add('')  # Marks Steam as removed (see _indexed_source)
 
     def specify_platform(self, path: str, platform: Platform) -> None:
         """Overwrite the platform value for a given path"""
         self.platforms[path] = platform
-        self._platform_changes_made()
+        self._platform_changes_made([path])
+
+    @timed('index_all')
+    def index_all(self, parallel: bool = False, per_device: int = 1,
+                  progress: Callable[[str, list[Item]], None] = None) -> None:
+        """
+        Index everything and append to self.games, then update stats
 
-    def index_all(self) -> None:
-        """Index everything and append to self.games, then update stats"""
+        Optional flag: parallel: bool (default: False)
+                       true: index the paths in a thread pool, <per_device> paths at a time per disk
+                       progress: Callable (default: None) called with (path, items) as soon as a path is indexed
+        """
+        start, instrumented = time.perf_counter(), INSTRUMENTS.summary()
+        self.is_indexed = False
         self._reset_games()
-        [self.index_platform_from_path(path, update_stats=False) for path, platform in self.platforms.items() if platform]
+        RULES.refresh()
+        paths = [path for path, platform in self.platforms.items() if platform]
+        if parallel:
+            self._games_by_root.update(run_per_device(paths, self._index_path, per_device=per_device,
+                                                      callback=progress))
+        else:
+            for path in paths:
+                self.index_platform_from_path(path, update_stats=False)
+                if progress:
+                    progress(path, self._games_by_root[path])
+        self._combine_games()
         self.update_stats()
         self.is_indexed = True
 
-    def create_shortcuts(self, dry_run: bool = False):
-        """Create shortcuts from self.games, as long as is_indexed == True"""
+        counts = {'games': len(self.games), **{flag: self.count(flag) for flag in
+                                                [RDFlag.INDEXED, RDFlag.BLACKLISTED, RDFlag.WHITELISTED]}}
+        counts.update({f'platform:{platform.id}': self.count(RDFlag.INDEXED, platform=platform)
+                       for platform in dict.fromkeys(self.platforms.values()) if platform})
+        self._record_run('index', 'index_all', start, len(self.games), instrumented, counts)
+
+    def create_shortcuts(self, dry_run: bool = False, workers: int = 8, sync: bool = False, verify: bool = True,
+                         progress: Callable[[dict], None] = None):
+        """
+        Create shortcuts from self.games, as long as is_indexed == True
+
+        Optional flag: workers: int (default: 8) amount of threads writing shortcuts
+                       sync: bool (default: False)
+                       true: compare against the active_shortcuts.log of the previous run,
+                             only creating/removing the shortcuts that changed (logs nothing if none did)
+                       verify: bool (default: True) when syncing, recreate unchanged shortcuts missing on disk
+                       progress: Callable (default: None) called with every log entry as soon as it is done
+
+        Shortcuts are journaled as they are written, if a run gets interrupted
+        its active_shortcuts.log is reconstructed and the next run resumes where it stopped
+        """
         # TODO: Tie in the logger class
         if not self.is_indexed:
             print('Cannot scan')
             return
-        [self.logger.add(create_shortcut(game, target_folder=self.target_folder, dry_run=dry_run)) for game in self.games]
+        start, instrumented = time.perf_counter(), INSTRUMENTS.summary()
+        self.refresh_lists()
+        journal = Journal(self.logs_folder)
+        previous, resume, diff = None, dict(), None
+        if journal.interrupted and not dry_run:
+            print('Info: Resuming an interrupted run')
+            previous, resume = journal.reconstruct(), journal.apply(dict())
+        elif sync and not dry_run:
+            previous = self.logger.load(self.logs_folder)
+            diff = diff_shortcuts(self.games, previous, target_folder=self.target_folder, verify=verify,
+                                  indexed=self._indexed_source)
+            if not diff.changes:
+                # Nothing changed since the previous run, nothing is written (no journal, no logs, no history)
+                print('Info: No shortcuts changed')
+                if progress:
+                    [progress(entry) for entry in iter_sync_shortcuts(self.games, previous, diff=diff)]
+                return
 
-        print(self.logger)
         if not dry_run:
-            self.logger.write(path_dir=LOGS_FOLDER)
+            self.logger.open(self.logs_folder)
+        try:
+            with journal if not dry_run else nullcontext(), \
+                    INSTRUMENTS.phase('sync_shortcuts' if sync else 'create_shortcuts') as counted:
+                if sync:
+                    previous = self.logger.load(self.logs_folder) if previous is None else previous
+                    entries = iter_sync_shortcuts(self.games, previous, target_folder=self.target_folder,
+                                                  dry_run=dry_run, workers=workers, journal=journal,
+                                                  verify=verify, indexed=self._indexed_source, diff=diff)
+                else:
+                    entries = iter_create_shortcuts(self.games, target_folder=self.target_folder, dry_run=dry_run,
+                                                    workers=workers, journal=journal, resume=resume)
+                # Every entry is logged as soon as it is done, without keeping the results
+                changed = False
+                with closing(entries):
+                    for entry in entries:
+                        changed = changed or entry.get('changed', True)
+                        self.logger.add(entry)
+                        if progress:
+                            progress(entry)
+                counted.append(self.logger.total + self.logger.removed + self.logger.skipped)
+        except BaseException:
+            # Interrupted (or cancelled through progress), the journal is left behind to resume from
+            self.logger.reset()
+            raise
+
+        print(self.logger)
+        if INSTRUMENTS.enabled:
+            print(INSTRUMENTS)
+        if not dry_run and sync and not changed:
+            # Nothing changed since the previous run, its logs (and the history) stay as they are
+            print('Info: No shortcuts changed')
+            journal.finish()
+        elif not dry_run:
+            self.logger.write(path_dir=self.logs_folder)
+            journal.finish()
+            self._record_run('shortcuts', 'create_shortcuts', start, len(self.games), instrumented,
+                             {'shortcuts': self.logger.successful + self.logger.skipped, 'removed': self.logger.removed,
+                              'blacklisted': self.logger.blacklisted})
         self.logger.reset()
 
+    def reindex(self, paths: list[str], directories: dict[str, set[str]] = None) -> None:
+        """
+        Re-indexes only the given folders (from the index cache where unchanged), then updates their stats
+
+        Optional flag: directories: dict (default: None) {folder: directories} known to be touched (see Watcher),
+                       the index cache only checks those instead of every directory of the folder
+        """
+        if not self.is_indexed:
+            self.index_all()
+            return
+        self._touched = directories or dict()
+        try:
+            self._platform_changes_made(paths)
+        finally:
+            self._touched = dict()
+
     def index_and_create_shortcuts(self):
         """Indexes all platforms and creates shortcuts for the games"""
         self.index_all()
@@ -239,11 +465,21 @@ class RomDetective:
         Statistics / Console
     """
 
+    def query(self, status: str = None, platform: Platform = None, path: str = None) -> list[Item]:
+        """
+        List the indexed games matching a status (RDFlag), platform and/or path (a key of self.platforms)
+        Only the games of the given path are visited when a path is specified
+        """
+        return self.game_index.query(status, platform, roots=[path] if path else self.platforms)
+
+    def count(self, status: str = None, platform: Platform = None, path: str = None) -> int:
+        """Count the indexed games matching a status (RDFlag), platform and/or path, without listing them"""
+        return self.game_index.count(status, platform, roots=[path] if path else self.platforms)
+
     def stats_by_platform(self, platform: Platform) -> dict:
         """Get the stats for a given platform"""
-        return {RDFlag.WHITELISTED: [game for game in self.stats[RDFlag.WHITELISTED] if game.platform == platform],
-                RDFlag.BLACKLISTED: [game for game in self.stats[RDFlag.BLACKLISTED] if game.platform == platform],
-                RDFlag.INDEXED: [game for game in self.stats[RDFlag.INDEXED] if game.platform == platform]}
+        return {flag: self.query(flag, platform=platform)
+                for flag in [RDFlag.WHITELISTED, RDFlag.BLACKLISTED, RDFlag.INDEXED]}
 
     """
         End Statistics / Console
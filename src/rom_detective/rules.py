@@ -0,0 +1,84 @@
+__all__ = ['ListRules', 'RuleSet', 'RULES']
+
+import os
+import re
+
+from rom_detective import CONF_FOLDER
+
+
+"""
+Rules
+=====
+blacklist.cfg and whitelist.cfg, loaded once into hash sets and reloaded only when the file changes
+
+Every (non-comment) line of a list is one of:
+    exact path: C:\\ROMs\\n64\\My Rom File.z64
+    folder: C:\\ROMs\\n64\\Hacks\\ (ends with a backslash, matches everything inside the folder)
+    wildcard: C:\\ROMs\\*\\Demo*.z64 (contains * or ?, matches the whole path)
+"""
+
+
+def _compile_wildcards(lines: list[str]) -> re.Pattern:
+    """Compiles wildcard lines into a single pattern, brackets are matched literally"""
+    patterns = [re.escape(line).replace(re.escape('*'), '.*').replace(re.escape('?'), '.') for line in lines]
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+
+
+class ListRules:
+    """Rules from a single list file"""
+    def __init__(self, path: str):
+        self.path = path
+        self.paths: set[str] = set()
+        self.folders: tuple[str, ...] = tuple()
+        self.wildcards: re.Pattern = None
+        self._stamp = None
+        self._loaded = False
+
+    def refresh(self) -> bool:
+        """(Re)loads the file if it changed since it was last loaded, returns True if it was (re)loaded"""
+        try:
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamp = None
+        if self._loaded and stamp == self._stamp:
+            return False
+
+        self._stamp = stamp
+        self._loaded = True
+        try:
+            lines = [line.strip() for line in open(self.path, 'r', encoding='utf8')]
+        except FileNotFoundError as e:
+            print(f'Warning: {e}')
+            lines = list()
+        lines = [line for line in lines if line and not line.startswith('#')]
+
+        self.paths = {line for line in lines if '*' not in line and '?' not in line}
+        self.folders = tuple(line for line in self.paths if line.endswith('\\'))
+        wildcards = [line for line in lines if '*' in line or '?' in line]
+        self.wildcards = _compile_wildcards(wildcards) if wildcards else None
+        return True
+
+    def matches(self, source: str) -> bool:
+        """Returns True if the source matches any rule, loads the file on first use"""
+        if not self._loaded:
+            self.refresh()
+        return (source in self.paths
+                or source.startswith(self.folders)
+                or bool(self.wildcards and self.wildcards.fullmatch(source)))
+
+
+class RuleSet:
+    """The blacklist and whitelist of a config folder"""
+    def __init__(self, folder: str = CONF_FOLDER):
+        self.blacklist = ListRules(f'{folder}\\blacklist.cfg')
+        self.whitelist = ListRules(f'{folder}\\whitelist.cfg')
+
+    def refresh(self) -> bool:
+        """Reloads any list that changed, returns True if either did"""
+        changed = self.blacklist.refresh()
+        return self.whitelist.refresh() or changed
+
+
+# Shared by every Item, unless one is specified on construction
+RULES = RuleSet()
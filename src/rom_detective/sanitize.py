@@ -0,0 +1,62 @@
+__all__ = ['Sanitizer', 'SANITIZER']
+
+import os
+import re
+from functools import lru_cache
+
+from rom_detective import ILLEGAL_CHARACTERS
+
+
+class Sanitizer:
+    """
+    Reformats filenames, the rules are compiled once and results are memoized (LRU)
+
+    - 1. Moves occurrences of ', The' to the front
+    - 2. Removes illegal characters
+    - 3. (clean_brackets flag) Removes parentheses and blocks,
+                               excluding those containing digits (Disc 1)
+                               Useful for most platforms, but not all
+    - 4. Fix some unicode characters
+    - 5. Remove excess whitespace
+    """
+    def __init__(self, illegal_characters: str = ILLEGAL_CHARACTERS, cache_size: int = 65536):
+        self.the = re.compile(r', the', flags=re.IGNORECASE)
+        self.illegal = re.compile(f'[{illegal_characters}]')
+        # TODO: Find a better solution to handle parentheses?
+        self.brackets = re.compile(r'\([^\d\)]*\)|\[[^\]]*\]')
+        self.whitespace = re.compile('[_ ]+')
+        self.sanitize = lru_cache(maxsize=cache_size)(self._sanitize)
+
+    @property
+    def fingerprint(self) -> str:
+        """The patterns of the rules, changes whenever the rules do"""
+        return '\n'.join(pattern.pattern for pattern in [self.the, self.illegal, self.brackets, self.whitespace])
+
+    def _sanitize(self, filename: str, clean_brackets: bool = True) -> str:
+        name, ext = os.path.splitext(filename)
+
+        # 1. ', The' to 'The *'
+        if ', the' in name.lower():
+            name = f'The {self.the.sub("", name)}'
+
+        # 2. Omit illegal characters
+        name = self.illegal.sub('', name)
+
+        # 3. (Optional) Remove (*) and [*] (excl. (*0-9))
+        name = self.brackets.sub('', name) if clean_brackets else name
+
+        # 4. Unicode fixes
+        name = name.replace('&amp;', '&')
+
+        # 5. Excess Whitespace
+        name = self.whitespace.sub(' ', name).strip()
+
+        return f'{name}{ext}'
+
+    def __call__(self, filename: str, clean_brackets: bool = True) -> str:
+        """Returns the sanitized filename"""
+        return self.sanitize(filename, clean_brackets)
+
+
+# Shared by every Item
+SANITIZER = Sanitizer()
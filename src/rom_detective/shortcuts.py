@@ -1,10 +1,18 @@
-__all__ = ['create_shortcut', 'get_destination_folder']
+__all__ = ['create_shortcut', 'create_shortcuts', 'iter_create_shortcuts', 'get_destination_folder',
+           'ShortcutDiff', 'diff_shortcuts', 'sync_shortcuts', 'iter_sync_shortcuts']
 
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Callable, Iterable, Iterator
 
 from rom_detective import DEFAULT_TARGET_FOLDER
+from rom_detective.instrumentation import timed
 from rom_detective.item import Item
+from rom_detective.journal import Journal
 from rom_detective.platforms import Platform
 from rom_detective.logger import LoggerFlag
 from rom_detective import const
@@ -26,31 +34,41 @@ def get_destination_folder(title: str, platform: Platform, target_folder: str =
                    dry_run: bool (default: False)
                    true: does not create any folders
     """
-    destination = target_folder
+    destination = f'{_platform_folder(platform, target_folder, fullname)}\\{title}'
+    if not dry_run:
+        _prepare_platform_folder(Path(destination).parent, default_location=_is_default_location(target_folder))
+    return destination
 
-    default_location = False
-    # If no destination folder is specified, use the default folder (%homepath%/ROMs)
-    if not destination or destination == DEFAULT_TARGET_FOLDER:
-        default_location = True
-        destination = DEFAULT_TARGET_FOLDER
 
-    # Append platform folder and title, fullname defines full platform name, or the shorthand (Windows | win)
-    destination += f'\\{platform.name}\\{title}' if fullname else f'\\{platform.id}\\{title}'
+def _is_default_location(target_folder: str) -> bool:
+    """If no destination folder is specified, the default folder (%homepath%/ROMs) is used"""
+    return not target_folder or target_folder == DEFAULT_TARGET_FOLDER
 
-    if dry_run:
-        return destination
 
+def _platform_folder(platform: Platform, target_folder: str = '', fullname: bool = True) -> str:
+    """Returns <target_folder>\\<platform_name>, fullname defines full platform name, or the shorthand (Windows | win)"""
+    target_folder = DEFAULT_TARGET_FOLDER if _is_default_location(target_folder) else target_folder
+    return f'{target_folder}\\{platform.name}' if fullname else f'{target_folder}\\{platform.id}'
+
+
+def _prepare_platform_folder(folder: Path, default_location: bool) -> bool:
+    """
+    Creates a platform folder if it does not exist
+
+    The ROMs directory itself is only created if no destination folder is manually specified
+    Returns True if the platform folder exists afterwards
+    """
     # Create ROMs directory if it does not exist AND no destination folder is manually specified
-    if not os.path.exists(Path(destination).parents[1]) and default_location:
-        print(f'Created directory {Path(destination).parents[1]}')
-        os.makedirs(Path(destination).parent)
+    if not os.path.exists(folder.parent) and default_location:
+        print(f'Created directory {folder.parent}')
+        os.makedirs(folder)
 
     # Verify that platform parent directory exists. If platform directory does not exist, create it
-    if os.path.exists(Path(destination).parents[1]) and not os.path.exists(Path(destination).parent):
-        print(f'Created directory {Path(destination).parent}')
-        os.makedirs(Path(destination).parent)
+    if os.path.exists(folder.parent) and not os.path.exists(folder):
+        print(f'Created directory {folder}')
+        os.makedirs(folder)
 
-    return destination
+    return os.path.exists(folder)
 
 
 def _create_shortcut(target_file: str, destination_file: str) -> dict:
@@ -94,6 +112,7 @@ def _create_rpcs3_shortcut(target_file: str, destination_file: str) -> dict:
     return {LoggerFlag.SUCCESS: f'{destination_file}->{target_file}'}
 
 
+@timed('create_shortcut')
 def create_shortcut(item: Item, target_folder: str = '',
                     fullname: bool = True, dry_run: bool = False) -> dict:
     """
@@ -112,18 +131,287 @@ def create_shortcut(item: Item, target_folder: str = '',
                    true: simulates creation of folders and shortcuts in terminal
     """
     if item.blacklisted and not item.whitelisted:
-        return {LoggerFlag.BLACKLIST: f'{item.source} [{item.filename}]'}
+        return _tagged({LoggerFlag.BLACKLIST: f'{item.source} [{item.filename}]'}, item)
 
     destination = get_destination_folder(item.filename, item.platform, target_folder=target_folder,
                                          fullname=fullname, dry_run=dry_run)
 
     # Dry run - don't create symlinks
     if dry_run:
-        return {LoggerFlag.DRY_RUN: f'{destination}->{item.source}'}
+        return _tagged({LoggerFlag.DRY_RUN: f'{destination}->{item.source}'}, item)
+
+    return _write_shortcut(item, destination)
+
 
+def _tagged(entry: dict, item: Item) -> dict:
+    """Tags a log entry with the platform of its item (see Logger)"""
+    entry['platform'] = item.platform.id
+    return entry
+
+
+def _unchanged(entry: dict) -> dict:
+    """Marks a log entry as unchanged since the previous run, it gets no record in log.jsonl (see Logger)"""
+    entry['changed'] = False
+    return entry
+
+
+@timed('write_shortcut')
+def _write_shortcut(item: Item, destination: str) -> dict:
+    """Creates the shortcut (.url), rpcs3 launcher (.bat) or symlink of an item at the destination"""
     if item.extension.lower() == '.url':
-        return _create_shortcut(target_file=item.source, destination_file=destination)
-    elif item.platform == const.PLATFORMS['ps3']:
-        return _create_rpcs3_shortcut(target_file=item.source, destination_file=destination)
+        return _tagged(_create_shortcut(target_file=item.source, destination_file=destination), item)
+    elif item.platform is const.PLATFORMS['ps3']:
+        return _tagged(_create_rpcs3_shortcut(target_file=item.source, destination_file=destination), item)
     else:
-        return _create_symlink(target_file=item.source, destination_file=destination)
+        return _tagged(_create_symlink(target_file=item.source, destination_file=destination), item)
+
+
+def _resolve_destinations(items: Iterable[Item], target_folder: str = '', fullname: bool = True,
+                          dry_run: bool = False) -> list[tuple[Item, str]]:
+    """
+    Returns a list of (item, destination), destination being None for blacklisted items
+
+    Every platform folder is checked (and created, unless dry_run) once, instead of once per item
+    """
+    default_location = _is_default_location(target_folder)
+    folders: dict[Platform, str] = dict()
+    prepared: dict[str, bool] = dict()
+
+    def destination(item: Item) -> str:
+        if item.platform not in folders:
+            folders[item.platform] = _platform_folder(item.platform, target_folder, fullname)
+        folder = folders[item.platform]
+        if not dry_run and folder not in prepared:
+            prepared[folder] = _prepare_platform_folder(Path(folder), default_location=default_location)
+        return f'{folder}\\{item.filename}'
+
+    return [(item, None if item.blacklisted and not item.whitelisted else destination(item)) for item in items]
+
+
+def _run_jobs(task: Callable, jobs: list, workers: int = 8) -> Iterator[dict]:
+    """
+    Runs task(job) for every job in a thread pool of <workers> threads, yields the results in the order of the jobs
+
+    At most 2 * <workers> jobs are queued at a time, when a job raises (or the caller stops iterating)
+    the queued jobs are cancelled, so only the jobs already running finish
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        yield from map(task, jobs)
+        return
+    executor = ThreadPoolExecutor(max_workers=workers)
+    queued = deque()
+    try:
+        for job in jobs:
+            queued.append(executor.submit(task, job))
+            if len(queued) >= workers * 2:
+                yield queued.popleft().result()
+        while queued:
+            yield queued.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _reported(results: Iterator[dict], progress: Callable[[dict], None] = None) -> list[dict]:
+    """Collects the results, calling progress(result) for every result as soon as it is done"""
+    reported = list()
+    with closing(results):
+        for result in results:
+            if progress:
+                progress(result)
+            reported.append(result)
+    return reported
+
+
+def _journaled(result: dict, journal: Journal = None) -> dict:
+    if journal:
+        journal.record(result)
+    return result
+
+
+@timed('create_shortcuts')
+def create_shortcuts(items: Iterable[Item], target_folder: str = '', fullname: bool = True,
+                     dry_run: bool = False, workers: int = 8,
+                     journal: Journal = None, resume: dict[str, str] = None,
+                     progress: Callable[[dict], None] = None) -> list[dict]:
+    """
+    Batch version of create_shortcut, returns the results in the order of the items (see iter_create_shortcuts)
+
+    Optional flag: progress: Callable (default: None) called with every result as soon as it is done
+    """
+    return _reported(iter_create_shortcuts(items, target_folder=target_folder, fullname=fullname, dry_run=dry_run,
+                                           workers=workers, journal=journal, resume=resume), progress)
+
+
+def iter_create_shortcuts(items: Iterable[Item], target_folder: str = '', fullname: bool = True,
+                          dry_run: bool = False, workers: int = 8,
+                          journal: Journal = None, resume: dict[str, str] = None) -> Iterator[dict]:
+    """
+    Creates the shortcuts of the items, yields the results in the order of the items as soon as they are done
+
+    Every platform folder is checked (and created) once up front,
+    then the shortcuts are written from a thread pool of <workers> threads
+
+    Optional flag: workers: int (default: 8)
+                   1: writes the shortcuts one at a time
+
+                   journal: Journal (default: None) records every shortcut as soon as it is written
+                   resume: dict (default: None) {shortcut: source} already created by an interrupted run,
+                           these are not written again (see Journal.apply)
+    """
+    resume = resume or dict()
+
+    def create(job: tuple[Item, str]) -> dict:
+        item, destination = job
+        if destination is None:
+            return _tagged({LoggerFlag.BLACKLIST: f'{item.source} [{item.filename}]'}, item)
+        if dry_run or destination in resume:
+            return _tagged({LoggerFlag.DRY_RUN if dry_run else LoggerFlag.SUCCESS: f'{destination}->{item.source}'},
+                           item)
+        return _journaled(_write_shortcut(item, destination), journal)
+
+    jobs = _resolve_destinations(items, target_folder=target_folder, fullname=fullname, dry_run=dry_run)
+    yield from _run_jobs(create, jobs, workers=1 if dry_run else workers)
+
+
+"""
+Shortcut sync
+=============
+Compares the shortcuts of the current index against the shortcuts of the previous run (Logger.load),
+so only the difference is written:
+    new: shortcuts that are not in the previous run, or have gone missing on disk
+    retargeted: shortcuts whose source changed, they are removed and created again
+    removed: shortcuts of the previous run that are no longer indexed (or are blacklisted now)
+    skipped: shortcuts of the previous run whose source was not indexed this run (e.g. a disconnected drive),
+             left alone and kept active, so they are not deleted and created again once the drive is back
+    unchanged: left alone
+
+Only symlinks, .url and .bat files are ever deleted
+"""
+
+
+@dataclass
+class ShortcutDiff:
+    new: list[tuple[Item, str]] = field(default_factory=list)
+    retargeted: list[tuple[Item, str]] = field(default_factory=list)
+    removed: dict[str, str] = field(default_factory=dict)
+    skipped: dict[str, str] = field(default_factory=dict)
+    unchanged: list[tuple[Item, str]] = field(default_factory=list)
+    blacklisted: list[Item] = field(default_factory=list)
+
+    @property
+    def changes(self) -> int:
+        """Amount of shortcuts that would be created, recreated or removed"""
+        return len(self.new) + len(self.retargeted) + len(self.removed)
+
+
+def _shortcut_files(destination: str) -> list[str]:
+    """The files a shortcut may have been written to (rpcs3 launchers get a .bat extension)"""
+    return [destination, f'{destination}.bat']
+
+
+def _shortcut_exists(destination: str) -> bool:
+    return any(os.path.lexists(path) for path in _shortcut_files(destination))
+
+
+def _remove_shortcut(destination: str) -> None:
+    """Deletes a shortcut, anything that is not a symlink, .url or .bat file is left alone"""
+    for path in _shortcut_files(destination):
+        if os.path.islink(path) or (path.lower().endswith(('.url', '.bat')) and os.path.isfile(path)):
+            os.remove(path)
+
+
+def diff_shortcuts(items: Iterable[Item], previous: dict[str, str], target_folder: str = '',
+                   fullname: bool = True, dry_run: bool = False, verify: bool = True,
+                   indexed: Callable[[str], bool] = None) -> ShortcutDiff:
+    """
+    Compares the shortcuts of the items against the previous run ({shortcut: source}, see Logger.load)
+
+    verify: check that the unchanged shortcuts still exist on disk (recreating the missing ones)
+    indexed: indexed(source) -> False if the source of a previous shortcut was not indexed this run,
+             its shortcut is skipped instead of removed (default: every source was indexed)
+    """
+    diff = ShortcutDiff()
+    current = set()
+    for item, destination in _resolve_destinations(items, target_folder=target_folder,
+                                                   fullname=fullname, dry_run=dry_run):
+        if destination is None:
+            diff.blacklisted.append(item)
+            continue
+        if destination in current:  # Duplicate title, the first item keeps the shortcut
+            continue
+        current.add(destination)
+        if destination not in previous:
+            diff.new.append((item, destination))
+        elif previous[destination] != item.source:
+            diff.retargeted.append((item, destination))
+        elif verify and not _shortcut_exists(destination):
+            diff.new.append((item, destination))
+        else:
+            diff.unchanged.append((item, destination))
+    for destination, source in previous.items():
+        if destination not in current:
+            if indexed is None or indexed(source):
+                diff.removed[destination] = source
+            else:
+                diff.skipped[destination] = source
+    return diff
+
+
+@timed('sync_shortcuts')
+def sync_shortcuts(items: Iterable[Item], previous: dict[str, str], target_folder: str = '',
+                   fullname: bool = True, dry_run: bool = False, workers: int = 8,
+                   journal: Journal = None, verify: bool = True, indexed: Callable[[str], bool] = None,
+                   progress: Callable[[dict], None] = None) -> list[dict]:
+    """
+    Like create_shortcuts, but only creates/removes the shortcuts that changed since the previous run
+    (see iter_sync_shortcuts)
+
+    Optional flag: progress: Callable (default: None) called with every result as soon as it is done
+    """
+    return _reported(iter_sync_shortcuts(items, previous, target_folder=target_folder, fullname=fullname,
+                                         dry_run=dry_run, workers=workers, journal=journal, verify=verify,
+                                         indexed=indexed), progress)
+
+
+def iter_sync_shortcuts(items: Iterable[Item], previous: dict[str, str], target_folder: str = '',
+                        fullname: bool = True, dry_run: bool = False, workers: int = 8,
+                        journal: Journal = None, verify: bool = True,
+                        indexed: Callable[[str], bool] = None, diff: ShortcutDiff = None) -> Iterator[dict]:
+    """
+    Only creates/removes the shortcuts that changed since the previous run
+    ({shortcut: source}, see Logger.load and Journal.apply), yields the results as soon as they are done
+    diff: the diff_shortcuts of the same arguments, if already computed
+
+    Yields a success (or dry_run) entry for every active shortcut, a blacklist entry for every blacklisted item,
+    a removed entry for every removed shortcut and a skipped entry for every shortcut of a source not indexed
+    (entries of what did not change are marked as such, see _unchanged)
+    """
+    diff = diff or diff_shortcuts(items, previous, target_folder=target_folder, fullname=fullname,
+                                  dry_run=dry_run, verify=verify, indexed=indexed)
+    active = LoggerFlag.DRY_RUN if dry_run else LoggerFlag.SUCCESS
+
+    def remove(job: tuple[str, str]) -> dict:
+        destination, source = job
+        if dry_run:
+            return {LoggerFlag.REMOVED: f'{destination}->{source}'}
+        _remove_shortcut(destination)
+        return _journaled({LoggerFlag.REMOVED: f'{destination}->{source}'}, journal)
+
+    def create(job: tuple[Item, str]) -> dict:
+        item, destination = job
+        if dry_run:
+            return _tagged({active: f'{destination}->{item.source}'}, item)
+        if destination in retargeted:
+            _remove_shortcut(destination)
+        return _journaled(_write_shortcut(item, destination), journal)
+
+    retargeted = {destination for _, destination in diff.retargeted}
+    workers = 1 if dry_run else workers
+    yield from _run_jobs(remove, list(diff.removed.items()), workers=workers)
+    yield from _run_jobs(create, diff.new + diff.retargeted, workers=workers)
+    for item, destination in diff.unchanged:
+        yield _unchanged(_tagged({active: f'{destination}->{item.source}'}, item))
+    for item in diff.blacklisted:
+        yield _unchanged(_tagged({LoggerFlag.BLACKLIST: f'{item.source} [{item.filename}]'}, item))
+    for destination, source in diff.skipped.items():
+        yield _unchanged({LoggerFlag.SKIPPED: f'{destination}->{source}'})
@@ -1,34 +1,107 @@
 import os
-import glob
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Container, Iterator
 
 import rom_detective.platforms as platforms
-from rom_detective.const import PLATFORMS
+from rom_detective.const import alias_index
+from rom_detective.instrumentation import timed
 
 
-def scan_for_files(directory: str, extensions: list, recursive: bool = True) -> list[str]:
+@timed('list_directory')
+def list_directory(directory: str, prune: set[str] = frozenset()) -> list[os.DirEntry]:
+    """
+    Lists a single directory using os.scandir, raises OSError if it can't be read
+    Hidden entries (.*) and pruned directories are left out
+    """
+    with os.scandir(directory) as listing:
+        return [entry for entry in listing if not entry.name.startswith('.')
+                and not (entry.name.lower() in prune and entry.is_dir())]
+
+
+def walk_listings(directory: str, max_depth: int = None, prune: set[str] = frozenset(), depth: int = 1,
+                  skip: Container[str] = frozenset(),
+                  mtimes: bool = True) -> Iterator[tuple[str, int, float, list[os.DirEntry]]]:
+    """
+    Lazily walks a directory tree (depth first), one directory listing (list_directory) at a time
+    Yields (directory, depth, mtime, entries) for every listed directory, the given directory being at <depth>
+
+    max_depth: deepest depth to list (default: None -> unlimited)
+    prune: lowercase names of directories to neither list nor yield as entries
+    skip: directories to not descend into (e.g. already known)
+    mtimes: False to not stat the directories (mtime None)
+
+    The mtime of a directory is taken from the listing of its parent (cached on Windows), before it is listed,
+    unreadable directories are ignored
+    """
+    try:
+        stack = [(directory, depth, os.stat(directory).st_mtime if mtimes else None)]
+    except OSError:
+        return
+    while stack:
+        current, depth, mtime = stack.pop()
+        try:
+            entries = list_directory(current, prune)
+        except OSError:
+            continue
+        subdirectories = list()
+        if max_depth is None or depth < max_depth:
+            for entry in entries:
+                path = f'{current}\\{entry.name}'
+                if entry.is_dir() and path not in skip:
+                    try:
+                        subdirectories.append((path, depth + 1, entry.stat().st_mtime if mtimes else None))
+                    except OSError:
+                        continue
+        yield current, depth, mtime, entries
+        stack += reversed(subdirectories)
+
+
+def walk_directory(directory: str, max_depth: int = None,
+                   prune: set[str] = frozenset()) -> Iterator[tuple[str, os.DirEntry]]:
+    """
+    Lazily walks a directory tree (depth first, see walk_listings)
+    Yields (abspath, DirEntry) for every entry, the DirEntry caches its type (and stat on Windows)
+
+    max_depth: amount of layers to list (default: None -> unlimited, 1 -> only the directory itself)
+    prune: lowercase names of directories to neither yield nor descend into (e.g. {'meta', 'content'})
+
+    Hidden entries (.*) are skipped, unreadable directories are ignored
+    """
+    for current, _, _, entries in walk_listings(directory, max_depth, prune, mtimes=False):
+        for entry in entries:
+            yield f'{current}\\{entry.name}', entry
+
+
+def iter_files(directory: str, extensions: list, recursive: bool = True,
+               prune: set[str] = frozenset()) -> Iterator[str]:
     """
     Takes a directory path to scan files from
-    Returns abspath to ALL files matching any extension from a list of extensions
+    Yields abspath to ALL files matching any extension from a list of extensions (case-insensitive)
     """
-    path = f'{directory}\\**/*.*' if recursive else f'{directory}\\*.*'
-    return [file for file in glob.glob(path, recursive=recursive)
-            if os.path.splitext(file)[1] in extensions]
+    extensions = {extension.lower() for extension in extensions}
+    return (path for path, entry in walk_directory(directory, max_depth=None if recursive else 1, prune=prune)
+            if os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file())
 
 
-def list_subfolders(directory: str, children: int = 2) -> list[str]:
+@timed('scan_for_files')
+def scan_for_files(directory: str, extensions: list, recursive: bool = True,
+                   prune: set[str] = frozenset()) -> list[str]:
+    """
+    Takes a directory path to scan files from
+    Returns abspath to ALL files matching any extension from a list of extensions (case-insensitive)
+    """
+    return list(iter_files(directory, extensions, recursive=recursive, prune=prune))
+
+
+@timed('list_subfolders')
+def list_subfolders(directory: str, children: int = 2, prune: set[str] = frozenset()) -> list[str]:
     """
     Takes a root directory path and iterates through <int> amount
     of children and returns a list of abs-paths
     """
-    output = list()
-    layer = list([directory])
-    for i in range(children):
-        result = list()
-        for directory in layer:
-            result += [f'{directory}\\{subdir}' for subdir in next(os.walk(directory))[1]]
-        output += result
-        layer = result.copy()
-    return output
+    return [path for path, entry in walk_directory(directory, max_depth=children, prune=prune)
+            if entry.is_dir()]
 
 
 def identify_platforms_from_path(path: str) -> dict[platforms.Platform]:
@@ -38,6 +111,54 @@ def identify_platforms_from_path(path: str) -> dict[platforms.Platform]:
 
     Format: {path: Platform}
     """
-    return {directory: platforms.identify_platform_from_path(directory, platforms=PLATFORMS)
+    return {directory: platform
             for directory in list_subfolders(path, children=1)
-            if platforms.identify_platform_from_path(directory, platforms=PLATFORMS)}
+            if (platform := platforms.identify_platform_from_path(directory, platforms=alias_index()))}
+
+
+def group_by_device(paths: list[str]) -> dict[int, list[str]]:
+    """
+    Groups paths by the device they are stored on (st_dev), keeping their order
+
+    Paths that can't be stat'ed get a group of their own
+    """
+    groups = dict()
+    for path in paths:
+        try:
+            device = os.stat(path).st_dev
+        except OSError:
+            device = path
+        groups.setdefault(device, list()).append(path)
+    return groups
+
+
+def run_per_device(paths: list[str], task: Callable[[str], any], per_device: int = 1,
+                   callback: Callable[[str, any], None] = None) -> dict[str, any]:
+    """
+    Runs task(path) for every path in a thread pool, with at most <per_device>
+    tasks running at once for paths on the same device (to avoid thrashing a single disk)
+
+    callback(path, result) is called as soon as a path is done, one call at a time
+
+    Returns a dict of {path: result} in the same order as the given paths
+    """
+    lanes = list()
+    for group in group_by_device(paths).values():
+        lanes += [group[i::per_device] for i in range(min(per_device, len(group)))]
+    lock = threading.Lock()
+
+    def run(path: str) -> any:
+        result = task(path)
+        if callback:
+            with lock:
+                callback(path, result)
+        return result
+
+    def run_lane(lane: list[str]) -> dict[str, any]:
+        return {path: run(path) for path in lane}
+
+    results = dict()
+    with ThreadPoolExecutor(max_workers=max(len(lanes), 1)) as pool:
+        for lane_results in pool.map(run_lane, lanes):
+            results.update(lane_results)
+    return {path: results[path] for path in paths}
@@ -0,0 +1,214 @@
+__all__ = ['Watcher']
+
+import os
+import threading
+import time
+from collections import deque
+
+from rom_detective.item import folder_rules
+from rom_detective.platforms import Platform, PlatformFlag
+from rom_detective.util import walk_listings
+
+
+"""
+Watcher
+=======
+Keeps the index and the shortcuts of a RomDetective up to date while its folders change
+
+Changes are picked up per directory, either through native filesystem events
+(watchdog, if installed: inotify, ReadDirectoryChangesW, FSEvents) or by polling the mtimes of the directories
+the indexer lists (adding, removing or renaming an entry changes the mtime of its directory).
+Polling stats <batch> directories per interval, round robin, so a large library is swept over several polls.
+
+Changes are batched: once no new change came in for <debounce> seconds, only the touched directories are
+re-listed through the index cache (an in-memory one is enabled if there is none) and the shortcuts are synced
+against the previous run, the logs and the history are only written if any shortcut changed.
+Steam libraries are watched through their steamapps folder only, and re-indexed as a whole.
+"""
+
+
+class Watcher:
+    """Watcher Class"""
+    def __init__(self, rd, debounce: float = 1.0, interval: float = 2.0, events: bool = True, batch: int = 1000):
+        """
+        rd: RomDetective to keep up to date
+        debounce: seconds without changes before a batch of changes is applied
+        interval: seconds between polls (polling only)
+        events: use native filesystem events if watchdog is installed, otherwise poll
+        batch: directories to stat per poll (polling only, None: every directory)
+        """
+        self.rd = rd
+        self.debounce = debounce
+        self.interval = interval
+        self.events = events
+        self.batch = batch
+        self.observer = None
+        self._watched: dict[str, tuple[str, int, frozenset[str]]] = dict()  # {root: see _watched}
+        self._mtimes: dict[str, dict[str, tuple[int, float]]] = dict()  # {root: {directory: (depth, mtime)}}
+        self._queue: deque[tuple[str, str]] = deque()  # (root, directory) to stat next
+        self._pending: dict[str, set[str]] = dict()  # {root: touched directories, None: the whole root}
+        self._last_change = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def roots(self) -> list[str]:
+        return [path for path, platform in self.rd.platforms.items() if platform]
+
+    def _watch(self) -> None:
+        """Looks up what to watch for every root once, again whenever the roots change"""
+        self._watched = {root: _watched(root, self.rd.platforms[root]) for root in self.roots}
+
+    def _root_of(self, path: str) -> str:
+        """Returns the (deepest) root containing a path, None if it isn't inside any"""
+        matches = [root for root, (directory, _, _) in self._watched.items()
+                   if path == directory or path.startswith(f'{directory}\\')]
+        return max(matches, key=len) if matches else None
+
+    def touch(self, root: str, directories: set[str] = None) -> None:
+        """Marks directories of a root (default: the whole root) as changed, applied once the changes settle"""
+        with self._lock:
+            if directories is None or self.rd.platforms[root].flag == PlatformFlag.STEAM:
+                self._pending[root] = None
+            elif root not in self._pending:
+                self._pending[root] = set(directories)
+            elif self._pending[root] is not None:
+                self._pending[root] |= set(directories)
+            self._last_change = time.monotonic()
+
+    def _start_observer(self) -> bool:
+        """Starts watching through native events, returns False if watchdog isn't available"""
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return False
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                for path in [event.src_path, getattr(event, 'dest_path', '')]:
+                    path = os.fsdecode(path) if path else ''
+                    root = watcher._root_of(path) if path else None
+                    if root:
+                        # The listing of its directory changed, a directory itself may have vanished
+                        watcher.touch(root, {os.path.dirname(path), *([path] if event.is_directory else [])})
+
+        self.observer = Observer()
+        for directory, depth, _ in self._watched.values():
+            if os.path.isdir(directory):
+                self.observer.schedule(Handler(), directory, recursive=depth != 1)
+        self.observer.start()
+        return True
+
+    def start(self) -> None:
+        """Indexes and syncs the shortcuts (if not done yet), then starts watching"""
+        if not self.rd.index_cache:
+            self.rd.enable_index_cache(':memory:')
+        if not self.rd.is_indexed:
+            self.rd.index_all(parallel=True)
+        self.rd.create_shortcuts(sync=True)
+        self._watch()
+        if not (self.events and self._start_observer()):
+            [self._snapshot(root) for root in self.roots]
+
+    def stop(self) -> None:
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+
+    def _snapshot(self, root: str, directory: str = None, depth: int = 1) -> None:
+        """Records the mtimes of a directory (default: the watched one of a root) and its unknown subdirectories"""
+        watched, max_depth, prune = self._watched[root]
+        mtimes = self._mtimes.setdefault(root, dict())
+        for path, depth, mtime, _ in walk_listings(directory or watched, max_depth, prune, depth=depth, skip=mtimes):
+            if path not in mtimes:
+                self._queue.append((root, path))
+            mtimes[path] = depth, mtime
+
+    def poll(self) -> set[str]:
+        """Stats the next <batch> watched directories, marks and returns the roots with changed directories"""
+        changed = dict()
+        if set(self._watched) != set(self.roots):
+            self._watch()
+        for root in self._watched:
+            if root not in self._mtimes:  # Added to the config
+                self._snapshot(root)
+                changed[root] = None
+        # Forget roots that were removed from the config
+        [self._mtimes.pop(root) for root in set(self._mtimes) - set(self._watched)]
+
+        for _ in range(len(self._queue) if self.batch is None else min(self.batch, len(self._queue))):
+            root, directory = self._queue.popleft()
+            mtimes = self._mtimes.get(root, dict())
+            if directory not in mtimes:  # Vanished, or its root was removed
+                continue
+            depth, mtime = mtimes[directory]
+            current = _mtime(directory)
+            if current == mtime:
+                self._queue.append((root, directory))
+                continue
+            changed.setdefault(root, set())
+            if changed[root] is not None:
+                changed[root].add(directory)
+            if current is None:  # Vanished, with everything below it
+                [mtimes.pop(path) for path in list(mtimes) if path == directory or path.startswith(f'{directory}\\')]
+            else:
+                self._snapshot(root, directory, depth)
+                self._queue.append((root, directory))
+        [self.touch(root, directories) for root, directories in changed.items()]
+        return set(changed)
+
+    def apply(self) -> list[str]:
+        """
+        Re-indexes the touched directories and syncs the shortcuts, once no change came in for <debounce> seconds
+        Returns the roots that were re-indexed
+        """
+        with self._lock:
+            if not self._pending or time.monotonic() - self._last_change < self.debounce:
+                return list()
+            pending = {root: self._pending[root] for root in self.roots if root in self._pending}
+            self._pending = dict()
+
+        roots = list(pending)
+        print(f'Info: Changes in {", ".join(roots)}')
+        self.rd.reindex(roots, directories={root: directories for root, directories in pending.items()
+                                            if directories is not None})
+        # Shortcuts of unchanged roots are trusted to still exist (no stat per shortcut)
+        self.rd.create_shortcuts(sync=True, verify=False)
+        return roots
+
+    def step(self) -> list[str]:
+        """One iteration of the watch loop, returns the roots that were re-indexed"""
+        if not self.observer:
+            self.poll()
+        return self.apply()
+
+    def run(self, stop: threading.Event = None) -> None:
+        """Watches until stop is set (or KeyboardInterrupt)"""
+        stop = stop or threading.Event()
+        self.start()
+        try:
+            while not stop.is_set():
+                self.step()
+                stop.wait(min(self.interval, self.debounce) if self.observer or self._pending else self.interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+def _watched(root: str, platform: Platform) -> tuple[str, int, frozenset[str]]:
+    """The directory watched for a root, the depth to watch it to (None: unlimited) and the pruned names"""
+    if platform.flag == PlatformFlag.STEAM:
+        return f'{root}\\steamapps', 1, frozenset()
+    rules = folder_rules(platform)
+    return root, rules.max_depth, rules.prune
+
+
+def _mtime(directory: str) -> float:
+    try:
+        return os.stat(directory).st_mtime
+    except OSError:
+        return None
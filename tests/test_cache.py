@@ -0,0 +1,127 @@
+import os
+import shutil
+
+from tests import *
+
+import rom_detective.cache
+from rom_detective.rom_detective import RomDetective, RDFlag
+from rom_detective.rules import RULES, ListRules
+from rom_detective.sanitize import Sanitizer
+
+
+def test_index_cache(tmp_path):
+    rd = RomDetective()
+    cache = rd.enable_index_cache(f'{tmp_path}\\index.db')
+
+    rd.add_rom_folder(TEST_ROMS_PATH)
+    rd.index_all()
+    games = [(game.source, game.filename, game.blacklisted) for game in rd.games]
+    assert cache.misses == 4 and cache.hits == 0
+
+    rd.index_all()
+    assert cache.misses == 4 and cache.hits == 4
+    assert games == [(game.source, game.filename, game.blacklisted) for game in rd.games]
+    assert len(rd.stats[RDFlag.INDEXED]) == 11
+    assert len(rd.stats[RDFlag.BLACKLISTED]) == 5
+
+
+def test_index_cache_invalidation(tmp_path):
+    os.makedirs(f'{tmp_path}\\n64\\nested')
+    open(f'{tmp_path}\\n64\\nested\\first.z64', 'w').close()
+
+    rd = RomDetective()
+    cache = rd.enable_index_cache(f'{tmp_path}\\index.db')
+    rd.add_rom_folder(f'{tmp_path}\\n64')
+    rd.index_all()
+    assert len(rd.games) == 1
+
+    open(f'{tmp_path}\\n64\\nested\\second.z64', 'w').close()
+    rd.index_all()
+    assert cache.misses == 2
+    assert len(rd.games) == 2
+
+
+def test_index_cache_relists_changed_directories(tmp_path):
+    for directory in ['a', 'b', 'b\\c']:
+        os.makedirs(f'{tmp_path}\\n64\\{directory}')
+        open(f'{tmp_path}\\n64\\{directory}\\game.z64', 'w').close()
+
+    rd = RomDetective()
+    cache = rd.enable_index_cache(f'{tmp_path}\\index.db')
+    rd.add_rom_folder(f'{tmp_path}\\n64')
+    rd.index_all()
+    assert cache.listed == 4 and len(rd.games) == 3
+
+    # Only the directory of the new file is listed again, new subdirectories are walked
+    open(f'{tmp_path}\\n64\\b\\new.z64', 'w').close()
+    os.makedirs(f'{tmp_path}\\n64\\a\\d')
+    open(f'{tmp_path}\\n64\\a\\d\\game.z64', 'w').close()
+    rd.index_all()
+    assert cache.listed == 4 + 3 and cache.misses == 2
+    uncached = RomDetective()
+    uncached.add_rom_folder(f'{tmp_path}\\n64')
+    uncached.index_all()
+    assert sorted(game.source for game in rd.games) == sorted(game.source for game in uncached.games)
+
+    # Vanished directories are dropped with their items
+    shutil.rmtree(f'{tmp_path}\\n64\\b')
+    rd.index_all()
+    assert [game.source for game in rd.games] == [f'{tmp_path}\\n64\\a\\game.z64', f'{tmp_path}\\n64\\a\\d\\game.z64']
+
+
+def test_index_cache_sizes(tmp_path):
+    os.makedirs(f'{tmp_path}\\n64')
+    open(f'{tmp_path}\\n64\\game.z64', 'w').write('1234')
+
+    rd = RomDetective()
+    cache = rd.enable_index_cache(f'{tmp_path}\\index.db')
+    rd.add_rom_folder(f'{tmp_path}\\n64')
+    rd.index_all()
+    assert cache.db.execute('SELECT entry, size FROM items').fetchall() == [('game.z64', 4)]
+
+    open(f'{tmp_path}\\n64\\other.z64', 'w').write('12')
+    rd.index_all()
+    assert sorted(cache.db.execute('SELECT entry, size FROM items').fetchall()) == [('game.z64', 4), ('other.z64', 2)]
+
+
+def test_index_cache_fingerprint(tmp_path, monkeypatch):
+    os.makedirs(f'{tmp_path}\\n64\\nested')
+    open(f'{tmp_path}\\n64\\nested\\game.z64', 'w').close()
+    monkeypatch.setattr(RULES, 'blacklist', ListRules(f'{tmp_path}\\blacklist.cfg'))
+    open(f'{tmp_path}\\blacklist.cfg', 'w', encoding='utf8').write('# Empty\n')
+
+    rd = RomDetective()
+    cache = rd.enable_index_cache(f'{tmp_path}\\index.db')
+    rd.add_rom_folder(f'{tmp_path}\\n64')
+    rd.index_all()
+    assert cache.listed == 2 and not rd.games[0].blacklisted
+
+    # Blacklist rules are applied on rehydration
+    open(f'{tmp_path}\\blacklist.cfg', 'w', encoding='utf8').write(f'{tmp_path}\\n64\\nested\\\n')
+    rd.index_all()
+    assert cache.hits == 1 and rd.games[0].blacklisted
+
+    # Other sanitize rules walk the root from scratch
+    monkeypatch.setattr(rom_detective.cache, 'SANITIZER', Sanitizer(illegal_characters='!'))
+    rd.index_all()
+    assert cache.misses == 2 and cache.listed == 4
+
+
+def test_index_cache_dependencies(tmp_path):
+    for directory in ['code', 'meta']:
+        os.makedirs(f'{tmp_path}\\wiiu\\Game\\{directory}')
+    open(f'{tmp_path}\\wiiu\\Game\\code\\game.rpx', 'w').close()
+    meta = f'{tmp_path}\\wiiu\\Game\\meta\\meta.xml'
+    open(meta, 'w').write('<menu><longname_en>First</longname_en></menu>')
+
+    rd = RomDetective()
+    cache = rd.enable_index_cache(f'{tmp_path}\\index.db')
+    rd.add_rom_folder(f'{tmp_path}\\wiiu')
+    rd.index_all()
+    assert [game.filename for game in rd.games] == ['First.rpx']
+
+    # meta.xml doesn't change the mtime of any listed directory
+    open(meta, 'w').write('<menu><longname_en>Second</longname_en></menu>')
+    os.utime(meta, (os.stat(meta).st_atime, os.stat(meta).st_mtime + 10))
+    rd.index_all()
+    assert cache.misses == 2 and [game.filename for game in rd.games] == ['Second.rpx']
@@ -0,0 +1,53 @@
+import os
+import sys
+
+from tests import *
+
+from rom_detective.__main__ import main
+
+
+def write_config(tmp_path) -> str:
+    config = f'{tmp_path}\\config.cfg'
+    open(config, 'w', encoding='utf-8').write(f'TARGET_FOLDER=={tmp_path}\\target\n'
+                                              f'default:::n64:::{TEST_ROMS_PATH}\\n64\n'
+                                              f'steam:::win:::{TEST_FILES_PATH}\\steam\n')
+    return config
+
+
+def test_cli(tmp_path, capsys):
+    options = ['--config', write_config(tmp_path), '--logs', str(tmp_path)]
+    assert main(['--logs', str(tmp_path), 'report']) == 0
+
+    assert main([*options, '--no-cache', 'stats']) == 0
+    out = capsys.readouterr().out
+    assert 'Nintendo 64' in out and 'games total over 2 platforms' in out
+
+    assert main([*options, '--no-cache', 'list', '--platform', 'n64']) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out and all(line.startswith('[n64]') for line in out)
+
+    assert main([*options, '--no-cache', 'dry-run']) == 0
+    assert 'Log results' in capsys.readouterr().out
+
+    assert main([*options, '--no-cache', 'list', '--platform', 'unknown']) == 2
+    assert main(['--config', f'{tmp_path}\\missing.cfg', 'index']) == 1
+    assert main(['--logs', str(tmp_path), 'report']) == 0
+    assert 'Latest index run' in capsys.readouterr().out
+    assert main([*options, 'report', '--count-threshold', '-1']) == 3
+    assert not any(module.startswith('PyQt6') for module in sys.modules)
+
+
+def test_cli_paths(tmp_path, capsys):
+    os.makedirs(f'{tmp_path}\\target')
+    options = ['--config', write_config(tmp_path), '--logs', f'{tmp_path}\\logs']
+
+    # The index cache is kept next to the config, the logs and the history go to --logs
+    assert main([*options, 'create']) == 0
+    assert os.path.isfile(f'{tmp_path}\\index.db')
+    assert {'active_shortcuts.log', 'history.jsonl'} <= set(os.listdir(f'{tmp_path}\\logs'))
+
+    # An index cache that can't be opened is reported, indexing goes on without it
+    os.remove(f'{tmp_path}\\index.db')
+    os.makedirs(f'{tmp_path}\\index.db')
+    assert main([*options, 'index']) == 0
+    assert 'Could not open the index cache' in capsys.readouterr().out
@@ -0,0 +1,55 @@
+import os
+
+from tests import *
+
+from rom_detective.compiled import compiled_path
+from rom_detective.databases import compile_database, open_database, CompactDatabase
+
+
+def test_compact_database(tmp_path):
+    open(f'{tmp_path}\\db.txt', 'w', encoding='utf8').write('# Comment\n'
+                                                           'BLUS00001=Second Title\n'
+                                                           'BCUS00001=First Title\n'
+                                                           'NPUB00001=Title = With Equals\n'
+                                                           '1=Short\n')
+    compile_database(f'{tmp_path}\\db.txt', f'{tmp_path}\\db.bin')
+    database = CompactDatabase(open(f'{tmp_path}\\db.bin', 'rb').read())
+
+    assert len(database) == 4
+    assert list(database) == ['1', 'BCUS00001', 'BLUS00001', 'NPUB00001']
+    assert database['BCUS00001'] == 'First Title'
+    assert database['NPUB00001'] == 'Title = With Equals'
+    assert database['1'] == 'Short'
+    assert 'BLUS00001' in database
+    assert 'BLUS0000' not in database and 'BLUS000010' not in database
+    with pytest.raises(KeyError):
+        database['# Comment']
+
+
+def test_open_database(tmp_path):
+    open(f'{tmp_path}\\db.txt', 'w', encoding='utf8').write('exampleid=Test ROM\n')
+    path = compiled_path(f'{tmp_path}\\db.txt', f'{tmp_path}\\cache', '.db')
+    database = open_database(f'{tmp_path}\\db.txt', folder=f'{tmp_path}\\cache')
+    assert database['exampleid'] == 'Test ROM'
+    assert os.path.exists(path)
+    database.buffer.close()
+
+    # Keyed on the content, a new mtime (one-file build: extracted on every launch) isn't recompiled
+    compiled = os.stat(path).st_mtime_ns
+    os.utime(f'{tmp_path}\\db.txt', (0, 0))
+    open_database(f'{tmp_path}\\db.txt', folder=f'{tmp_path}\\cache').buffer.close()
+    assert os.stat(path).st_mtime_ns == compiled
+
+    open(f'{tmp_path}\\db.txt', 'w', encoding='utf8').write('exampleid=Changed ROM\n')
+    database = open_database(f'{tmp_path}\\db.txt', folder=f'{tmp_path}\\cache')
+    assert database['exampleid'] == 'Changed ROM'
+    database.buffer.close()
+
+    # Sources sharing a filename are compiled side by side
+    os.makedirs(f'{tmp_path}\\other')
+    open(f'{tmp_path}\\other\\db.txt', 'w', encoding='utf8').write('exampleid=Other ROM\n')
+    open_database(f'{tmp_path}\\other\\db.txt', folder=f'{tmp_path}\\cache').buffer.close()
+    compiled = os.stat(path).st_mtime_ns
+    database = open_database(f'{tmp_path}\\db.txt', folder=f'{tmp_path}\\cache')
+    assert database['exampleid'] == 'Changed ROM' and os.stat(path).st_mtime_ns == compiled
+    database.buffer.close()
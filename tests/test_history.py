@@ -0,0 +1,44 @@
+from tests import *
+
+from rom_detective.history import RunHistory
+from rom_detective.rom_detective import RomDetective
+
+
+def test_history(tmp_path):
+    rd = RomDetective()
+    history = rd.enable_history(str(tmp_path))
+    rd.add_rom_folder(TEST_ROMS_PATH)
+    rd.index_all()
+    rd.index_all()
+
+    records = history.records('index')
+    assert len(records) == 2
+    assert records[0]['counts']['games'] == len(rd.games)
+    assert records[0]['counts']['platform:n64'] == rd.count('indexed', platform=rd.platforms[f'{TEST_ROMS_PATH}\\n64'])
+    assert records[0]['phases']['index_all']['items'] == len(rd.games)
+
+
+def test_report(tmp_path):
+    history = RunHistory(str(tmp_path))
+    for seconds in [1.0, 1.1, 0.9]:
+        history.append('index', {'index_all': {'calls': 1, 'seconds': seconds, 'items': 1000}},
+                       {'games': 1000, 'platform:n64': 500})
+    assert history.report() == []
+
+    history.append('index', {'index_all': {'calls': 1, 'seconds': 2.0, 'items': 1000}}, {'games': 900})
+    open(history.path, 'a', encoding='utf-8').write('{"cut off')
+    regressions = {regression.metric: regression for regression in history.report()}
+    assert set(regressions) == {'index_all items/s', 'games', 'platform:n64'}
+    assert regressions['index_all items/s'].change == pytest.approx(-0.5)
+    assert regressions['platform:n64'].value == 0
+    assert 'dropped 10%' in str(regressions['games'])
+
+
+def test_report_ignores_other_counts(tmp_path):
+    history = RunHistory(str(tmp_path))
+    for removed in [0, 0, 40, 0]:
+        history.append('shortcuts', {}, {'shortcuts': 100, 'removed': removed, 'blacklisted': 40 - removed})
+    assert history.report() == []
+
+    history.append('shortcuts', {}, {'shortcuts': 50, 'removed': 0, 'blacklisted': 0})
+    assert [regression.metric for regression in history.report()] == ['shortcuts']
@@ -0,0 +1,64 @@
+from tests import *
+
+from rom_detective.instrumentation import INSTRUMENTS, Instruments
+from rom_detective.rom_detective import RomDetective
+
+
+def test_instrumentation():
+    rd = RomDetective()
+    rd.add_rom_folder(TEST_ROMS_PATH)
+    rd.add_steam_folder(f'{TEST_FILES_PATH}\\steam')
+
+    INSTRUMENTS.reset()
+    rd.index_all()
+    assert not INSTRUMENTS.phases
+
+    instruments = rd.enable_instrumentation(memory=True)
+    try:
+        rd.index_all()
+        summary = instruments.summary()
+    finally:
+        instruments.disable()
+
+    assert summary['index_all']['calls'] == 1
+    assert summary['index_wiiu_folder']['items'] == len([game for game in rd.games if game.platform.id == 'wiiu'])
+    assert summary['list_directory']['calls'] >= 2 and summary['index_generic_folder']['calls'] >= 1
+    assert summary['index_all']['seconds'] >= summary['index_wiiu_folder']['seconds']
+    assert summary['index_all']['peak_memory'] >= summary['index_wiiu_folder']['peak_memory'] >= 0
+    assert 'index_all' in str(instruments)
+
+
+def test_instrumentation_cached(tmp_path):
+    rd = RomDetective()
+    rd.enable_index_cache(f'{tmp_path}\\index.db')
+    rd.add_rom_folder(TEST_ROMS_PATH)
+
+    instruments = rd.enable_instrumentation()
+    try:
+        rd.index_all()
+        first = instruments.summary()
+        instruments.reset()
+        rd.index_all()
+        second = instruments.summary()
+    finally:
+        instruments.disable()
+
+    # Walked while filling the cache, only rehydrated afterwards
+    assert first['index_cache']['items'] == second['index_cache']['items'] == len(rd.games)
+    assert first['list_directory']['calls'] >= 2 and 'list_directory' not in second
+
+
+def test_phase():
+    instruments = Instruments()
+    with instruments.phase('disabled'):
+        pass
+    assert not instruments.phases
+
+    instruments.enable()
+    with instruments.phase('enabled') as items:
+        items.append(3)
+    with instruments.phase('enabled'):
+        pass
+    instruments.disable()
+    assert instruments.summary() == {'enabled': {'name': 'enabled', 'calls': 2, 'seconds': pytest.approx(0, abs=1),
+                                                 'items': 4, 'peak_memory': None}}
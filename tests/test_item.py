@@ -1,5 +1,8 @@
+import struct
+
 from tests import *
 
+from rom_detective.item import Item, PS3Item, WiiUItem, SteamItem
 from rom_detective.rom_detective import RomDetective, RDFlag
 
 
@@ -40,3 +43,11 @@ def test_all():
     assert len(rd.games) == 19
     assert len(rd.stats[RDFlag.INDEXED]) == 13
     assert len(rd.stats[RDFlag.BLACKLISTED]) == 6
+
+
+def test_item_slots():
+    # Subclasses only add slots for their own fields
+    assert PS3Item.__slots__ == SteamItem.__slots__ == ('g_id',) and WiiUItem.__slots__ == ()
+    assert WiiUItem.__basicsize__ == Item.__basicsize__
+    assert PS3Item.__basicsize__ == SteamItem.__basicsize__ == Item.__basicsize__ + struct.calcsize('P')
+    assert not hasattr(WiiUItem(source='game.wux'), '__dict__')
@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from tests import *
+
+from rom_detective import shortcuts
+from rom_detective.jobs import Job, JobCancelled, index_job, shortcuts_job
+from rom_detective.logger import LoggerFlag
+from rom_detective.rom_detective import RomDetective, RDFlag
+
+
+def detective() -> RomDetective:
+    rd = RomDetective()
+    rd.add_rom_folder(TEST_ROMS_PATH)
+    rd.add_steam_folder(f'{TEST_FILES_PATH}\\steam')
+    return rd
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+def test_index_job(parallel):
+    rd = detective()
+    reports, done = list(), list()
+    job = index_job(rd, parallel=parallel, on_progress=reports.append, on_done=done.append).start()
+    assert job.wait(timeout=30) == rd.games and done == [rd.games]
+    assert not job.running and job.finished
+
+    roots = [path for path, platform in rd.platforms.items() if platform]
+    assert [report.done for report in reports] == list(range(1, len(roots) + 1))
+    assert sorted(report.path for report in reports) == sorted(roots)
+    assert all(report.total == len(roots) for report in reports)
+    assert reports[-1].counts == {'games': len(rd.games), **{flag: rd.count(flag) for flag in
+                                  [RDFlag.WHITELISTED, RDFlag.BLACKLISTED, RDFlag.INDEXED]}}
+
+
+def test_shortcuts_job():
+    rd = detective()
+    reports = list()
+    shortcuts_job(rd, dry_run=True, sync=False, on_progress=reports.append).start().wait(timeout=30)
+    assert rd.is_indexed
+    entries = [report for report in reports if report.phase == 'shortcuts']
+    assert len(entries) == len(rd.games)
+    assert entries[-1].counts[LoggerFlag.BLACKLIST] == rd.count(RDFlag.BLACKLISTED)
+
+
+def test_cancel_job():
+    rd = detective()
+    errors = list()
+    job = index_job(rd, on_error=errors.append)
+    job.cancel()
+    job.run()
+    assert isinstance(errors[0], JobCancelled) and not rd.is_indexed
+    with pytest.raises(JobCancelled):
+        job.wait()
+
+    with pytest.raises(ZeroDivisionError):
+        Job(lambda job: 1 / 0).start().wait(timeout=30)
+
+
+def test_cancel_reindex():
+    rd = detective()
+    rd.index_all()
+
+    def progress(path: str, items: list) -> None:
+        job.cancel()
+        job.check_cancelled()
+
+    job = Job(lambda job: rd.index_all(progress=progress))
+    with pytest.raises(JobCancelled):
+        job.start().wait(timeout=30)
+    # Cancelled after the first folder, the games of the previous index are gone as well
+    assert not rd.is_indexed
+
+
+@pytest.mark.createfiles(reason='Creates folders & files, use --create-files flag to run')
+def test_cancel_shortcuts_job(tmp_path, monkeypatch):
+    written = list()
+
+    def write(item, destination):
+        written.append(destination)
+        time.sleep(0.001)
+        return {LoggerFlag.SUCCESS: f'{destination}->{item.source}'}
+
+    monkeypatch.setattr(shortcuts, '_write_shortcut', write)
+    rd = detective()
+    rd.index_all()
+    rd.games = rd.games * 100
+    rd.target_folder = f'{tmp_path}\\target'
+    rd.logs_folder = str(tmp_path)
+
+    errors = list()
+    job = shortcuts_job(rd, sync=False, workers=4, on_error=errors.append)
+    job.on_progress = lambda progress: job.cancel() if progress.done == 3 else None
+    with pytest.raises(JobCancelled):
+        job.start().wait(timeout=30)
+    assert isinstance(errors[0], JobCancelled)
+    assert len(written) <= 3 + 2 * 4 + 1
+    assert rd.logger.total == 0
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from tests import *
+
+from rom_detective import shortcuts
+from rom_detective.journal import Journal
+from rom_detective.logger import Logger, LoggerFlag
+from rom_detective.rom_detective import RomDetective
+from rom_detective.shortcuts import create_shortcuts
+
+
+def test_journal(tmp_path):
+    open(f'{tmp_path}\\active_shortcuts.log', 'w', encoding='utf-8').write('old->source\nkept->source')
+    journal = Journal(str(tmp_path), checkpoint=1)
+    assert not journal.interrupted
+
+    with journal:
+        journal.record({LoggerFlag.SUCCESS: 'new->source'})
+        journal.record({LoggerFlag.REMOVED: 'old->source'})
+        journal.record({LoggerFlag.BLACKLIST: 'ignored'})
+    open(journal.path, 'a', encoding='utf-8').write('+cut off')
+
+    assert journal.interrupted
+    assert journal.apply(dict()) == {'new': 'source'}
+    assert journal.reconstruct() == {'kept': 'source', 'new': 'source'}
+    assert Logger().load(str(tmp_path)) == {'kept': 'source', 'new': 'source'}
+
+    journal.finish()
+    assert not journal.interrupted
+
+
+@pytest.mark.createfiles(reason='Creates folders & files, use --create-files flag to run')
+def test_resume(tmp_path, monkeypatch):
+    rd = RomDetective()
+    rd.add_rom_folder(f'{TEST_ROMS_PATH}\\n64')
+    rd.add_steam_folder(f'{TEST_FILES_PATH}\\steam')
+    rd.index_all()
+    target = f'{tmp_path}\\target'
+    os.makedirs(target)
+
+    # Interrupt the run after the first shortcut
+    written = list()
+    write_shortcut = shortcuts._write_shortcut
+
+    def interrupted(item, destination):
+        if written:
+            raise RuntimeError('Interrupted')
+        written.append(destination)
+        return write_shortcut(item, destination)
+
+    journal = Journal(str(tmp_path))
+    monkeypatch.setattr(shortcuts, '_write_shortcut', interrupted)
+    with pytest.raises(RuntimeError), journal:
+        create_shortcuts(rd.games, target_folder=target, workers=1, journal=journal)
+    assert journal.interrupted
+
+    # The next run resumes, without writing the first shortcut again
+    resumed = list()
+    monkeypatch.setattr(shortcuts, '_write_shortcut', lambda item, destination: resumed.append(destination) or
+                        write_shortcut(item, destination))
+    with journal:
+        results = create_shortcuts(rd.games, target_folder=target, journal=journal, resume=journal.apply(dict()))
+    assert written[0] not in resumed
+    assert len([result for result in results if LoggerFlag.SUCCESS in result]) == len(rd.stats['indexed'])
@@ -0,0 +1,42 @@
+import json
+
+from tests import *
+
+from rom_detective.logger import Logger, LoggerFlag
+
+
+def test_logger(tmp_path):
+    logger = Logger()
+    logger.add({LoggerFlag.SUCCESS: 'C:\\ROMs\\Nintendo 64\\a.z64->D:\\n64\\a.z64', 'platform': 'n64'})
+    logger.add({LoggerFlag.SUCCESS: 'C:\\ROMs\\Nintendo 64\\b.z64->D:\\n64\\b.z64', 'platform': 'n64'})
+    logger.add({LoggerFlag.BLACKLIST: 'D:\\n64\\c.z64 [c.z64]', 'platform': 'n64'})
+    logger.add({LoggerFlag.REMOVED: 'C:\\ROMs\\Nintendo 64\\d.z64->D:\\n64\\d.z64'})
+    assert (logger.successful, logger.blacklisted, logger.removed, logger.total) == (2, 1, 1, 3)
+
+    assert logger.write(str(tmp_path))
+    assert logger.load(str(tmp_path)) == {'C:\\ROMs\\Nintendo 64\\a.z64': 'D:\\n64\\a.z64',
+                                          'C:\\ROMs\\Nintendo 64\\b.z64': 'D:\\n64\\b.z64'}
+    assert open(f'{tmp_path}\\blacklist.log', encoding='utf-8').read() == 'D:\\n64\\c.z64 [c.z64]\n'
+
+    records = [json.loads(line) for line in open(f'{tmp_path}\\log.jsonl', encoding='utf-8')]
+    assert [record['kind'] for record in records] == ['success', 'success', 'blacklist', 'removed']
+    assert records[0]['destination'] == 'C:\\ROMs\\Nintendo 64\\a.z64' and records[0]['platform'] == 'n64'
+    assert records[2]['source'] == 'D:\\n64\\c.z64' and not records[2]['destination']
+    logger.reset()
+
+    # Records are appended, across runs
+    logger.open(str(tmp_path))
+    logger.add({LoggerFlag.SUCCESS: 'e->f'})
+    # Unchanged entries are only kept in active_shortcuts.log
+    logger.add({LoggerFlag.SUCCESS: 'g->h', 'changed': False})
+    logger.write(str(tmp_path))
+    assert len(open(f'{tmp_path}\\log.jsonl', encoding='utf-8').readlines()) == 5
+    assert logger.load(str(tmp_path)) == {'e': 'f', 'g': 'h'}
+    logger.reset()
+
+
+def test_logger_dry_run(tmp_path):
+    logger = Logger()
+    logger.add({LoggerFlag.DRY_RUN: 'a->b'})
+    assert not logger.write(str(tmp_path))
+    assert 'Successful games: 1' in str(logger)
@@ -0,0 +1,86 @@
+import os
+
+from tests import *
+
+from dataclasses import FrozenInstanceError
+
+from rom_detective.const import PLATFORMS, alias_index
+from rom_detective.platforms import Platform, PlatformFlag, AliasIndex, import_platforms, identify_platform
+from rom_detective.rom_detective import RomDetective
+from rom_detective.compiled import load_compiled
+
+
+def test_alias_index():
+    platforms = import_platforms(f'{TEST_FILES_PATH}\\platforms.yaml')
+    index = AliasIndex(platforms)
+    assert index.lookup('C:\\ROMs\\Test 1\\Nested') == platforms[0]
+    assert index.lookup('C:\\ROMs\\test2 2') == platforms[1]
+    assert index.lookup('C:\\ROMs\\test2 2\\test1') == platforms[0]
+    assert index.lookup('C:\\ROMs\\unknown') is None
+
+    assert identify_platform('test2', platforms) == identify_platform('test2', index) == platforms[1]
+    with pytest.raises(Warning):
+        identify_platform('C:\\ROMs\\unknown', index)
+
+    # The index of PLATFORMS is built once
+    assert alias_index() is alias_index()
+    assert identify_platform('C:\\ROMs\\n64', alias_index()) is PLATFORMS['n64']
+
+
+def test_alias_conflicts():
+    first = Platform(id='first', name='First', aliases=['shared'], extensions=[])
+    second = Platform(id='second', name='Second', aliases=['shared'], extensions=[])
+    index = AliasIndex([first, second])
+    assert index.lookup('shared') == first
+    assert index.lookup('second') == second
+
+
+def test_load_compiled(tmp_path):
+    calls = list()
+
+    def loader(path: str) -> str:
+        calls.append(path)
+        return open(path, 'r', encoding='utf8').read()
+
+    open(f'{tmp_path}\\source.txt', 'w', encoding='utf8').write('first')
+    assert load_compiled(f'{tmp_path}\\source.txt', loader, folder=f'{tmp_path}\\cache') == 'first'
+    assert load_compiled(f'{tmp_path}\\source.txt', loader, folder=f'{tmp_path}\\cache') == 'first'
+    assert len(calls) == 1
+
+    # Keyed on the content, a new mtime (one-file build: extracted on every launch) reuses the compiled copy
+    os.utime(f'{tmp_path}\\source.txt', (0, 0))
+    assert load_compiled(f'{tmp_path}\\source.txt', loader, folder=f'{tmp_path}\\cache') == 'first'
+    assert len(calls) == 1
+
+    open(f'{tmp_path}\\source.txt', 'w', encoding='utf8').write('changed')
+    assert load_compiled(f'{tmp_path}\\source.txt', loader, folder=f'{tmp_path}\\cache') == 'changed'
+    assert len(calls) == 2
+
+    # Sources sharing a filename get their own compiled copy
+    os.makedirs(f'{tmp_path}\\other')
+    open(f'{tmp_path}\\other\\source.txt', 'w', encoding='utf8').write('other')
+    assert load_compiled(f'{tmp_path}\\other\\source.txt', loader, folder=f'{tmp_path}\\cache') == 'other'
+    assert load_compiled(f'{tmp_path}\\source.txt', loader, folder=f'{tmp_path}\\cache') == 'changed'
+    assert len(calls) == 3
+
+
+def test_interned_platforms():
+    first = import_platforms(f'{TEST_FILES_PATH}\\platforms.yaml')
+    second = import_platforms(f'{TEST_FILES_PATH}\\platforms.yaml')
+    assert all(a is b for a, b in zip(first, second))
+    assert len(set(first + second)) == len(first)
+
+    platform = first[0]
+    steam = platform.with_flag(PlatformFlag.STEAM)
+    assert steam is not platform and steam is platform.with_flag(PlatformFlag.STEAM)
+    assert steam.id == platform.id and platform.flag == PlatformFlag.DEF_ROM
+    with pytest.raises(FrozenInstanceError):
+        platform.flag = PlatformFlag.STEAM
+
+
+def test_steam_platform_is_separate():
+    rd = RomDetective()
+    rd.add_steam_folder(f'{TEST_FILES_PATH}\\steam')
+    rd.index_all()
+    assert rd.platforms[f'{TEST_FILES_PATH}\\steam'].flag == PlatformFlag.STEAM
+    assert PLATFORMS['win'].flag == PlatformFlag.DEF_ROM
@@ -0,0 +1,30 @@
+from tests import *
+
+from rom_detective.rom_detective import RomDetective, RDFlag
+from rom_detective.const import PLATFORMS
+
+
+def test_query():
+    rd = RomDetective()
+    rd.add_rom_folder(TEST_ROMS_PATH)
+    rd.add_steam_folder(f'{TEST_FILES_PATH}\\steam')
+    rd.index_all()
+
+    for flag in [RDFlag.WHITELISTED, RDFlag.BLACKLISTED, RDFlag.INDEXED]:
+        assert rd.query(flag) == rd.stats[flag]
+        assert rd.count(flag) == len(rd.stats[flag])
+    assert rd.count() == len(rd.games)
+
+    n64 = f'{TEST_ROMS_PATH}\\n64'
+    assert rd.query(path=n64) == [game for game in rd.games if n64 in game.source]
+    assert rd.count(RDFlag.INDEXED, path=n64) + rd.count(RDFlag.BLACKLISTED, path=n64) == 3
+    assert rd.query(RDFlag.INDEXED, platform=PLATFORMS['n64']) == rd.query(RDFlag.INDEXED, path=n64)
+    assert rd.count(platform=PLATFORMS['n64']) == len(rd.query(platform=PLATFORMS['n64'])) == 3
+
+    steam = rd.platforms[f'{TEST_FILES_PATH}\\steam']
+    assert rd.count(platform=steam) == rd.count(path=f'{TEST_FILES_PATH}\\steam') > 0
+    assert rd.count(platform=PLATFORMS['win']) == 0
+
+    rd.remove_folder(n64)
+    assert rd.count(path=n64) == 0
+    assert rd.count() == len(rd.games)
@@ -4,6 +4,7 @@ from tests import *
 
 from rom_detective.rom_detective import RomDetective, RDFlag
 from rom_detective.const import PLATFORMS
+from rom_detective.rules import RULES, ListRules
 from rom_detective import initialize_folder
 
 
@@ -29,6 +30,74 @@ def test_simulate_user():
     assert not PLATFORMS['n64'] in rd.platforms.values()
 
 
+def test_incremental_index(tmp_path):
+    rd = RomDetective()
+    cache = rd.enable_index_cache(f'{tmp_path}\\index.db')
+
+    rd.add_rom_folder(TEST_ROMS_PATH)
+    rd.index_all()
+    assert cache.misses == 4
+    assert len(rd.games) == 16
+
+    # Only the changed folder is dropped and re-indexed
+    rd.specify_platform(f'{TEST_ROMS_PATH}\\n64', PLATFORMS['atari2600'])
+    assert rd.is_indexed
+    assert cache.misses == 5
+    assert len(rd.games) == 13
+    assert not [game for game in rd.games if game.platform == PLATFORMS['n64']]
+
+    rd.specify_platform(f'{TEST_ROMS_PATH}\\n64', PLATFORMS['n64'])
+    assert len(rd.games) == 16
+    assert len(rd.stats[RDFlag.INDEXED]) == 11
+
+    rd.remove_folder(f'{TEST_ROMS_PATH}\\switch')
+    assert cache.misses == 6
+    assert len(rd.games) == 11
+    assert len(rd.stats[RDFlag.INDEXED]) + len(rd.stats[RDFlag.BLACKLISTED]) == 11
+
+    rd.add_rom_folder(f'{TEST_ROMS_PATH}\\switch')
+    assert len(rd.games) == 16
+    assert cache.misses == 6
+
+
+def test_parallel_index():
+    rd = RomDetective()
+
+    rd.add_rom_folder(TEST_ROMS_PATH)
+    rd.add_steam_folder(f'{TEST_FILES_PATH}\\steam')
+    rd.index_all()
+    serial = [game.source for game in rd.games]
+
+    rd.index_all(parallel=True, per_device=2)
+    assert serial == [game.source for game in rd.games]
+    assert len(rd.stats[RDFlag.INDEXED]) == 13
+    assert len(rd.stats[RDFlag.BLACKLISTED]) == 6
+
+
+def test_refresh_lists(tmp_path, monkeypatch):
+    monkeypatch.setattr(RULES, 'blacklist', ListRules(f'{tmp_path}\\blacklist.cfg'))
+    monkeypatch.setattr(RULES, 'whitelist', ListRules(f'{tmp_path}\\whitelist.cfg'))
+    open(f'{tmp_path}\\blacklist.cfg', 'w', encoding='utf8').write('# Empty\n')
+    open(f'{tmp_path}\\whitelist.cfg', 'w', encoding='utf8').write('# Empty\n')
+
+    rd = RomDetective()
+    rd.add_rom_folder(f'{TEST_ROMS_PATH}\\n64')
+    rd.index_all()
+    games = list(rd.games)
+    assert len(rd.stats[RDFlag.BLACKLISTED]) == 0
+    assert not rd.refresh_lists()
+
+    open(f'{tmp_path}\\blacklist.cfg', 'w', encoding='utf8').write(f'{TEST_ROMS_PATH}\\n64\\\n')
+    assert rd.refresh_lists()
+    assert all(game is previous for game, previous in zip(rd.games, games))
+    assert len(rd.stats[RDFlag.BLACKLISTED]) == 3
+
+    open(f'{tmp_path}\\whitelist.cfg', 'w', encoding='utf8').write(f'{games[0].source}\n')
+    assert rd.refresh_lists()
+    assert len(rd.stats[RDFlag.BLACKLISTED]) == 2
+    assert len(rd.stats[RDFlag.WHITELISTED]) == 1
+
+
 @pytest.mark.createfiles(reason='Creates folders & files, use --create-files flag to run')
 def test_create_shortcuts():
     with pytest.raises(RuntimeError):
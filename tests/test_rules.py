@@ -0,0 +1,30 @@
+from tests import *
+
+from rom_detective.item import Item
+from rom_detective.rules import RuleSet
+from rom_detective.const import PLATFORMS
+
+
+def test_rules(tmp_path):
+    open(f'{tmp_path}\\blacklist.cfg', 'w', encoding='utf8').write('# Comment\n'
+                                                                  'C:\\ROMs\\n64\\exact.z64\n'
+                                                                  'C:\\ROMs\\n64\\Hacks\\\n'
+                                                                  'C:\\ROMs\\*\\Demo [*].z64\n')
+    open(f'{tmp_path}\\whitelist.cfg', 'w', encoding='utf8').write('C:\\ROMs\\n64\\Hacks\\allowed.z64\n')
+    rules = RuleSet(folder=f'{tmp_path}')
+    assert rules.refresh()
+
+    assert rules.blacklist.matches('C:\\ROMs\\n64\\exact.z64')
+    assert rules.blacklist.matches('C:\\ROMs\\n64\\Hacks\\Nested\\hack.z64')
+    assert rules.blacklist.matches('C:\\ROMs\\n64\\Demo [Europe].z64')
+    assert not rules.blacklist.matches('C:\\ROMs\\n64\\Demo.z64')
+    assert not rules.blacklist.matches('# Comment')
+    assert not rules.refresh()
+
+    item = Item(source='C:\\ROMs\\n64\\Hacks\\allowed.z64', platform=PLATFORMS['n64'], rules=rules)
+    assert item.blacklisted and item.whitelisted
+
+    open(f'{tmp_path}\\blacklist.cfg', 'w', encoding='utf8').write('C:\\ROMs\\n64\\other.z64\n')
+    assert rules.refresh()
+    assert not rules.blacklist.matches('C:\\ROMs\\n64\\exact.z64')
+    assert rules.blacklist.matches('C:\\ROMs\\n64\\other.z64')
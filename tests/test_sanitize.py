@@ -0,0 +1,19 @@
+from tests import *
+
+from rom_detective.sanitize import Sanitizer
+
+
+def test_sanitize():
+    sanitizer = Sanitizer()
+    assert sanitizer('Legend of Zelda, The (USA) [!].z64') == 'The Legend of Zelda.z64'
+    assert sanitizer('Game: Subtitle™ (Disc 1).iso') == 'Game Subtitle (Disc 1).iso'
+    assert sanitizer('Game (Europe) [test].z64', clean_brackets=False) == 'Game (Europe) [test].z64'
+    assert sanitizer('Rock__&amp;  Roll.nsp') == 'Rock & Roll.nsp'
+
+
+def test_sanitize_cache():
+    sanitizer = Sanitizer(cache_size=8)
+    names = ['test (Europe).z64', 'test (USA).z64', 'test (Europe).z64']
+    assert [sanitizer(name) for name in names] == ['test.z64', 'test.z64', 'test.z64']
+    assert sanitizer.sanitize.cache_info().hits == 1
+    assert sanitizer.sanitize.cache_info().misses == 2
@@ -0,0 +1,132 @@
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from tests import *
+
+from rom_detective.const import PLATFORMS
+from rom_detective.rom_detective import RomDetective
+from rom_detective.shortcuts import _run_jobs, create_shortcut, create_shortcuts, diff_shortcuts, sync_shortcuts
+from rom_detective.logger import Logger, LoggerFlag
+
+
+def test_create_shortcuts_dry_run(tmp_path):
+    rd = RomDetective()
+    rd.add_rom_folder(TEST_ROMS_PATH)
+    rd.add_steam_folder(f'{TEST_FILES_PATH}\\steam')
+    rd.index_all()
+
+    expected = [create_shortcut(game, target_folder=str(tmp_path), dry_run=True) for game in rd.games]
+    assert create_shortcuts(rd.games, target_folder=str(tmp_path), dry_run=True) == expected
+    assert not os.listdir(tmp_path)
+
+
+@pytest.mark.createfiles(reason='Creates folders & files, use --create-files flag to run')
+def test_create_shortcuts(tmp_path):
+    rd = RomDetective()
+    rd.add_rom_folder(f'{TEST_ROMS_PATH}\\n64')
+    rd.add_steam_folder(f'{TEST_FILES_PATH}\\steam')
+    rd.index_all()
+
+    results = create_shortcuts(rd.games, target_folder=str(tmp_path), workers=4)
+    assert [next(iter(result)) for result in results] == \
+           [LoggerFlag.BLACKLIST if game.blacklisted and not game.whitelisted else LoggerFlag.SUCCESS
+            for game in rd.games]
+    assert sorted(os.listdir(tmp_path)) == sorted({game.platform.name for game in rd.stats['indexed']})
+
+
+@pytest.mark.createfiles(reason='Creates folders & files, use --create-files flag to run')
+def test_sync_shortcuts(tmp_path):
+    rd = RomDetective()
+    rd.add_rom_folder(f'{TEST_ROMS_PATH}\\n64')
+    rd.add_steam_folder(f'{TEST_FILES_PATH}\\steam')
+    rd.index_all()
+    target = f'{tmp_path}\\target'
+    os.makedirs(target)
+
+    logger = Logger()
+    [logger.add(result) for result in sync_shortcuts(rd.games, logger.load(str(tmp_path)), target_folder=target)]
+    # Games with the same title share one shortcut
+    assert logger.successful == len({game.filename for game in rd.stats['indexed']}) and logger.removed == 0
+    logger.write(str(tmp_path))
+
+    # Unchanged library, nothing to do
+    previous = Logger().load(str(tmp_path))
+    assert len(previous) == logger.successful
+    diff = diff_shortcuts(rd.games, previous, target_folder=target)
+    assert diff.changes == 0 and len(diff.unchanged) == len(previous)
+    assert all(entry['changed'] is False for entry in sync_shortcuts(rd.games, previous, target_folder=target))
+
+    # A shortcut that is no longer indexed is removed, a new one is created
+    previous.popitem()
+    previous[f'{target}\\gone.url'] = 'URL=steam://rungameid/0'
+    open(f'{target}\\gone.url', 'w').close()
+    diff = diff_shortcuts(rd.games, previous, target_folder=target)
+    assert len(diff.removed) == 1 and len(diff.new) == 1
+
+    results = sync_shortcuts(rd.games, previous, target_folder=target)
+    assert {LoggerFlag.REMOVED: f'{target}\\gone.url->URL=steam://rungameid/0'} in results
+    assert not os.path.exists(f'{target}\\gone.url')
+
+
+def test_run_jobs_stops_on_error():
+    started, lock = list(), threading.Lock()
+
+    def task(job: int) -> int:
+        with lock:
+            started.append(job)
+        time.sleep(0.001)
+        if job == 2:
+            raise RuntimeError('No privileges')
+        return job
+
+    with pytest.raises(RuntimeError):
+        list(_run_jobs(task, list(range(2000)), workers=4))
+    assert len(started) <= 3 + 2 * 4
+
+    # The caller stopping (a cancelled job) stops the run as well
+    started.clear()
+    results = _run_jobs(task, list(range(3, 2000)), workers=4)
+    assert [next(results) for _ in range(3)] == [3, 4, 5]
+    results.close()
+    assert len(started) <= 3 + 2 * 4 + 1
+
+
+@pytest.mark.createfiles(reason='Creates folders & files, use --create-files flag to run')
+def test_sync_keeps_unreachable_folders(tmp_path):
+    root, target = f'{tmp_path}\\n64', f'{tmp_path}\\target'
+    shutil.copytree(f'{TEST_ROMS_PATH}\\n64', root)
+    os.makedirs(target)
+    rd = RomDetective()
+    rd.add_rom_folder(root, platform=PLATFORMS['n64'])
+    rd.index_all()
+
+    logger = Logger()
+    [logger.add(result) for result in sync_shortcuts(rd.games, dict(), target_folder=target,
+                                                      indexed=rd._indexed_source)]
+    logger.write(str(tmp_path))
+    previous = Logger().load(str(tmp_path))
+    assert previous and logger.successful == len(previous)
+
+    # A disconnected drive: nothing is removed, the shortcuts stay active
+    os.rename(root, f'{tmp_path}\\offline')
+    rd.index_all()
+    assert not rd.games
+    diff = diff_shortcuts(rd.games, previous, target_folder=target, indexed=rd._indexed_source)
+    assert not diff.removed and diff.skipped == previous
+
+    logger = Logger()
+    [logger.add(result) for result in sync_shortcuts(rd.games, previous, target_folder=target,
+                                                      indexed=rd._indexed_source)]
+    assert logger.skipped == len(previous) and logger.removed == 0
+    logger.write(str(tmp_path))
+    assert Logger().load(str(tmp_path)) == previous
+    assert all(os.path.lexists(shortcut) for shortcut in previous)
+
+    # Removing the folder does remove its shortcuts
+    rd.remove_folder(root)
+    diff = diff_shortcuts(rd.games, previous, target_folder=target, indexed=rd._indexed_source)
+    assert diff.removed == previous and not diff.skipped
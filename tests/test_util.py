@@ -0,0 +1,24 @@
+import os
+
+from tests import *
+
+from rom_detective.util import scan_for_files, list_subfolders
+
+
+def test_scan_for_files(tmp_path):
+    os.makedirs(f'{tmp_path}\\roms\\nested\\meta')
+    open(f'{tmp_path}\\roms\\lower.z64', 'w').close()
+    open(f'{tmp_path}\\roms\\nested\\UPPER.Z64', 'w').close()
+    open(f'{tmp_path}\\roms\\nested\\meta\\pruned.z64', 'w').close()
+    open(f'{tmp_path}\\roms\\nested\\other.txt', 'w').close()
+
+    files = scan_for_files(f'{tmp_path}\\roms', extensions=['.z64'], prune={'meta'})
+    assert sorted(files) == [f'{tmp_path}\\roms\\lower.z64', f'{tmp_path}\\roms\\nested\\UPPER.Z64']
+    assert scan_for_files(f'{tmp_path}\\roms', extensions=['.z64'], recursive=False) == [f'{tmp_path}\\roms\\lower.z64']
+
+
+def test_list_subfolders():
+    assert sorted(list_subfolders(f'{TEST_ROMS_PATH}\\wiiu', children=1)) == [f'{TEST_ROMS_PATH}\\wiiu\\test',
+                                                                             f'{TEST_ROMS_PATH}\\wiiu\\test2']
+    assert len(list_subfolders(f'{TEST_ROMS_PATH}\\wiiu', children=3)) == 9
+    assert len(list_subfolders(f'{TEST_ROMS_PATH}\\wiiu', children=3, prune={'code', 'meta'})) == 4
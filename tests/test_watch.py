@@ -0,0 +1,70 @@
+import os
+import shutil
+
+import pytest
+
+from tests import *
+
+from rom_detective.const import PLATFORMS
+from rom_detective.rom_detective import RomDetective
+from rom_detective.watch import Watcher
+
+
+def test_watch_polling(tmp_path, monkeypatch):
+    roots = [f'{tmp_path}\\n64', f'{tmp_path}\\gba']
+    shutil.copytree(f'{TEST_ROMS_PATH}\\n64', roots[0])
+    os.makedirs(roots[1])
+
+    rd = RomDetective()
+    rd.add_rom_folder(roots[0], platform=PLATFORMS['n64'])
+    rd.add_rom_folder(roots[1], platform=PLATFORMS['gba'])
+    synced = list()
+    monkeypatch.setattr(rd, 'create_shortcuts', lambda **kwargs: synced.append(kwargs))
+
+    watcher = Watcher(rd, debounce=0, events=False)
+    watcher.start()
+    assert rd.is_indexed and synced == [{'sync': True}]
+    games, listed = len(rd.games), rd.index_cache.listed
+    assert watcher.step() == []
+
+    # Only the touched directories are listed again
+    os.makedirs(f'{roots[1]}\\nested')
+    open(f'{roots[1]}\\nested\\new game.gba', 'w').close()
+    assert watcher.step() == [roots[1]]
+    assert len(rd.games) == games + 1 and rd.count(platform=PLATFORMS['gba']) == 1
+    assert rd.index_cache.listed == listed + 2
+    assert synced[-1] == {'sync': True, 'verify': False}
+
+    # Bursts are applied once the changes settle
+    watcher.debounce = 60
+    os.remove(f'{roots[1]}\\nested\\new game.gba')
+    assert watcher.step() == [] and len(rd.games) == games + 1
+    watcher.debounce = 0
+    assert watcher.step() == [roots[1]] and len(rd.games) == games
+    assert rd.index_cache.listed == listed + 3
+    assert len(synced) == 3
+
+    # Polls stat <batch> directories at a time
+    watcher.batch = 1
+    shutil.rmtree(f'{roots[1]}\\nested')
+    assert {root for _ in range(4) for root in watcher.poll()} == {roots[1]}
+    assert watcher.apply() == [roots[1]] and len(rd.games) == games
+
+
+@pytest.mark.createfiles(reason='Creates folders & files, use --create-files flag to run')
+def test_unchanged_sync_writes_nothing(tmp_path, monkeypatch):
+    rd = RomDetective()
+    rd.add_rom_folder(f'{TEST_ROMS_PATH}\\n64')
+    rd.target_folder = f'{tmp_path}\\target'
+    rd.logs_folder = f'{tmp_path}\\logs'
+    os.makedirs(rd.target_folder)
+    history = rd.enable_history()
+    rd.index_all()
+    rd.create_shortcuts(sync=True)
+    logs = {name: open(f'{tmp_path}\\logs\\{name}').read() for name in os.listdir(f'{tmp_path}\\logs')}
+
+    monkeypatch.setattr(rd.logger, 'open', lambda path_dir: pytest.fail('Opened the logs of an unchanged sync'))
+    rd.create_shortcuts(sync=True)
+    assert len(history.records('shortcuts')) == 1
+    assert sorted(os.listdir(f'{tmp_path}\\logs')) == sorted(logs)
+    assert logs == {name: open(f'{tmp_path}\\logs\\{name}').read() for name in os.listdir(f'{tmp_path}\\logs')}